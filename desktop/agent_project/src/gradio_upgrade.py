@@ -49,7 +49,7 @@ except ImportError:
 # 导入记忆模块（如果可用）
 try:
     sys.path.insert(0, "/data1/cyx/Kylin-TARS")
-    from memory_store import list_trajectories, search_trajectories
+    from memory_store import list_trajectories, search_trajectories, format_timestamp
     from memory_retrieve import retrieve_similar_trajectory, semantic_retrieve
     from memory_visualization import generate_visualization_html, get_trajectory_summary
     from collaboration_logger import query_logs, get_log_chain, get_log_statistics
@@ -1212,8 +1212,8 @@ def create_ui():
                             try:
                                 trajectories = list_trajectories(limit=10)
                                 memory_data = [
-                                    [t.get("task", "")[:50], 
-                                     t.get("timestamp", ""),
+                                    [t.get("task", "")[:50],
+                                     format_timestamp(t),
                                      "✓" if t.get("success") else "✗",
                                      ", ".join(t.get("agents_involved", []))]
                                     for t in trajectories
@@ -1563,8 +1563,8 @@ def create_ui():
             try:
                 trajectories = list_trajectories(limit=10)
                 return [
-                    [t.get("task", "")[:50], 
-                     t.get("timestamp", ""),
+                    [t.get("task", "")[:50],
+                     format_timestamp(t),
                      "✓" if t.get("success") else "✗",
                      ", ".join(t.get("agents_involved", []))]
                     for t in trajectories
@@ -1583,15 +1583,15 @@ def create_ui():
                     trajectories = search_trajectories(keyword=keyword, limit=10)
                 
                 return [
-                    [t.get("task", "")[:50], 
-                     t.get("timestamp", ""),
+                    [t.get("task", "")[:50],
+                     format_timestamp(t),
                      "✓" if t.get("success") else "✗",
                      ", ".join(t.get("agents_involved", []))]
                     for t in trajectories
                 ]
             except:
                 return []
-        
+
         def generate_memory_visualization(agent_filter: str, time_days: int, layout: str):
             if not HAS_MEMORY:
                 return "<p>记忆模块不可用</p>"
@@ -7,10 +7,16 @@ import time
 import logging
 from mcp_client.agent_registry import InitDb, ListAgents, UpsertAgent
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - MCP Client - %(levelname)s - %(message)s")
+# 只配置自己的命名日志器，不经 basicConfig 改动全局根日志器；
+# 处理器带防重复挂载保护，propagate=False 避免经根日志器重复输出
 logger = logging.getLogger("MCP Client")
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter(
+        "%(asctime)s - MCP Client - %(levelname)s - %(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
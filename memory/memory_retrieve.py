@@ -14,6 +14,8 @@
 
 import json
 import time
+import heapq
+import functools
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple, Any
 
@@ -22,6 +24,7 @@ from memory_store import (
     list_trajectories,
     search_trajectories,
     extract_keywords,
+    format_timestamp,
     STORAGE_DIR
 )
 
@@ -67,6 +70,17 @@ if not HAS_KYLIN_AI:
 # 相似度计算函数
 # ============================================================
 
+@functools.lru_cache(maxsize=2048)
+def _tokset(text: str) -> frozenset:
+    """
+    文本 → 分词 frozenset（带缓存）
+
+    基础匹配回退路径每次对比都要重新 split + 建集合；同一条历史任务
+    在一次检索中会与查询反复对比，缓存后每条文本只分词一次。
+    """
+    return frozenset(text.split())
+
+
 def calculate_text_similarity(text1: str, text2: str, method: str = "token_sort") -> int:
     """
     计算两段文本的相似度
@@ -99,37 +113,66 @@ def calculate_text_similarity(text1: str, text2: str, method: str = "token_sort"
             # 简单匹配
             return fuzz.ratio(text1, text2)
     else:
-        # 基础匹配：基于关键词重叠
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+        # 基础匹配：基于关键词重叠（分词集合带缓存，直接做交并集）
+        words1 = _tokset(text1)
+        words2 = _tokset(text2)
         if not words1 or not words2:
             return 0
         intersection = len(words1 & words2)
-        union = len(words1 | words2)
-        return int(intersection / union * 100) if union > 0 else 0
+        union = len(words1) + len(words2) - intersection
+        return int(intersection * 100 / union) if union > 0 else 0
+
+
+@functools.lru_cache(maxsize=4096)
+def _kwset(keywords: Tuple[str, ...]) -> frozenset:
+    """
+    关键词元组 → 小写 frozenset（带缓存）
+
+    每条轨迹的关键词集合只需构建一次；后续 Jaccard 计算直接做集合运算。
+    新轨迹已在保存时预存 keywords_lower，这里对旧格式同样兜底小写。
+    """
+    return frozenset(k.lower() for k in keywords)
+
+
+def _keyword_jaccard(set1: frozenset, set2: frozenset) -> int:
+    """
+    frozenset 版 Jaccard 相似度（热路径快速通道）
+
+    Args:
+        set1: 关键词集合1
+        set2: 关键词集合2
+
+    Returns:
+        相似度分数 (0-100)
+    """
+    if not set1 or not set2:
+        return 0
+
+    intersection = len(set1 & set2)
+    union = len(set1) + len(set2) - intersection
+
+    return int(intersection / union * 100) if union > 0 else 0
 
 
 def calculate_keyword_similarity(keywords1: List[str], keywords2: List[str]) -> int:
     """
     计算关键词列表的相似度（Jaccard 相似度）
-    
+
     Args:
         keywords1: 关键词列表1
         keywords2: 关键词列表2
-        
+
     Returns:
         相似度分数 (0-100)
     """
     if not keywords1 or not keywords2:
         return 0
-    
-    set1 = set(k.lower() for k in keywords1)
-    set2 = set(k.lower() for k in keywords2)
-    
-    intersection = len(set1 & set2)
-    union = len(set1 | set2)
-    
-    return int(intersection / union * 100) if union > 0 else 0
+
+    return _keyword_jaccard(_kwset(tuple(keywords1)), _kwset(tuple(keywords2)))
+
+
+# 综合相似度的默认权重（文本相似度, 部分匹配, 关键词相似度）
+_DEFAULT_WEIGHTS = (0.5, 0.3, 0.2)
 
 
 def calculate_combined_similarity(
@@ -137,7 +180,7 @@ def calculate_combined_similarity(
     task2: str,
     keywords1: List[str],
     keywords2: List[str],
-    weights: Tuple[float, float, float] = (0.5, 0.3, 0.2)
+    weights: Tuple[float, float, float] = _DEFAULT_WEIGHTS
 ) -> int:
     """
     计算综合相似度（结合多种匹配策略）
@@ -165,10 +208,80 @@ def calculate_combined_similarity(
     
     # 加权综合
     combined = int(w1 * text_sim + w2 * partial_sim + w3 * keyword_sim)
-    
+
     return min(combined, 100)
 
 
+@functools.lru_cache(maxsize=4096)
+def _combined_sim(
+    task1: str,
+    task2: str,
+    keywords1: Tuple[str, ...],
+    keywords2: Tuple[str, ...]
+) -> int:
+    """
+    calculate_combined_similarity 的会话内缓存版本
+
+    同一 (当前任务, 历史任务) 对会在 retrieve_similar_trajectory →
+    reuse_reasoning_chain → reasoning_with_retrieval 的调用链中被反复打分，
+    这里用 lru_cache 消除重复的 fuzz/Jaccard 计算。
+    关键词以 tuple 传入（可哈希），内部转回 list 复用原实现。
+
+    Args:
+        task1: 任务描述1
+        task2: 任务描述2
+        keywords1: 关键词元组1
+        keywords2: 关键词元组2
+
+    Returns:
+        综合相似度分数 (0-100)
+    """
+    return calculate_combined_similarity(task1, task2, list(keywords1), list(keywords2))
+
+
+def _combined_sim_bounded(
+    task1: str,
+    task2: str,
+    keywords1: Tuple[str, ...],
+    keywords2: Tuple[str, ...],
+    best_score: int
+) -> int:
+    """
+    带剪枝的综合相似度计算（branch-and-bound）
+
+    按计算代价从低到高分阶段打分：先算关键词 Jaccard（纯集合操作），
+    再算 partial 匹配，最后才算最贵的 token_sort。每个阶段都用
+    「未计算项按满分 100 估计」得到组合分上界，一旦上界无法超过
+    当前最优分就提前放弃，跳过后续昂贵计算。
+
+    Args:
+        task1: 当前任务描述
+        task2: 历史任务描述
+        keywords1: 当前任务关键词元组
+        keywords2: 历史任务关键词元组
+        best_score: 当前已知的最优分数
+
+    Returns:
+        综合相似度分数 (0-100)；若上界不足以超过 best_score 返回 -1
+    """
+    w1, w2, w3 = _DEFAULT_WEIGHTS
+
+    # 阶段1: 关键词 Jaccard（最便宜，集合已缓存）
+    keyword_sim = _keyword_jaccard(_kwset(keywords1), _kwset(keywords2))
+    if int(w1 * 100 + w2 * 100 + w3 * keyword_sim) <= best_score:
+        return -1
+
+    # 阶段2: 部分匹配
+    partial_sim = calculate_text_similarity(task1, task2, "partial")
+    if int(w1 * 100 + w2 * partial_sim + w3 * keyword_sim) <= best_score:
+        return -1
+
+    # 阶段3: 分词排序匹配（最贵）
+    text_sim = calculate_text_similarity(task1, task2, "token_sort")
+
+    return min(int(w1 * text_sim + w2 * partial_sim + w3 * keyword_sim), 100)
+
+
 # ============================================================
 # 核心检索函数
 # ============================================================
@@ -254,20 +367,20 @@ def semantic_retrieve(
             history_np = np.array(history_vector)
             similarity = np.dot(query_np, history_np) / (np.linalg.norm(query_np) * np.linalg.norm(history_np))
             
-            if similarity >= threshold:
+            # 优先使用该轨迹自己学到的复用阈值（vCache 式），无则用全局阈值
+            entry_threshold = traj.get("per_entry_threshold", threshold)
+            if similarity >= entry_threshold:
                 scored_trajectories.append((traj, float(similarity)))
         except Exception as e:
             if verbose:
                 print(f"⚠️ 计算相似度失败: {e}")
             continue
     
-    # 按相似度降序排序
-    scored_trajectories.sort(key=lambda x: x[1], reverse=True)
-    
     if verbose:
         print(f"语义检索找到 {len(scored_trajectories)} 条相似轨迹（阈值≥{threshold:.0%}）")
-    
-    return scored_trajectories[:3]  # 返回前3个
+
+    # 只取前3个：O(N log k) 的堆选取，免去全量排序
+    return heapq.nlargest(3, scored_trajectories, key=lambda x: x[1])
 
 
 def retrieve_similar_trajectory(
@@ -327,32 +440,38 @@ def retrieve_similar_trajectory(
     if verbose:
         print(f"检索范围: 最近 {len(trajectories)} 条轨迹")
     
-    # 提取当前任务的关键词
-    current_keywords = extract_keywords(user_task)
-    
+    # 提取当前任务的关键词（转为 tuple 以便缓存命中）
+    current_keywords = tuple(extract_keywords(user_task))
+
     # 遍历计算相似度
     best_match = None
     best_score = 0
     match_details = []
-    
+
     for traj in trajectories:
         history_task = traj.get("task", "")
-        history_keywords = traj.get("keywords", [])
-        
+        # 优先使用保存时预计算的小写关键词，旧格式回退到 keywords
+        history_keywords = traj.get("keywords_lower") or traj.get("keywords", [])
+
         if not history_task:
             continue
-        
-        # 计算综合相似度
-        score = calculate_combined_similarity(
+
+        # 计算综合相似度（带剪枝：上界打不过当前最优时跳过昂贵计算）
+        score = _combined_sim_bounded(
             user_task, history_task,
-            current_keywords, history_keywords
+            current_keywords, tuple(history_keywords),
+            best_score
         )
-        
+
+        if score < 0:
+            # 被剪枝：该轨迹不可能超过当前最优，不计入匹配详情
+            continue
+
         match_details.append({
             "task": history_task[:40] + "..." if len(history_task) > 40 else history_task,
             "score": score
         })
-        
+
         if score > best_score:
             best_score = score
             best_match = traj
@@ -402,26 +521,41 @@ def retrieve_top_k_trajectories(
     if not trajectories:
         return []
     
-    current_keywords = extract_keywords(user_task)
-    
-    scored_trajectories = []
+    current_keywords = tuple(extract_keywords(user_task))
+    w1, w2, w3 = _DEFAULT_WEIGHTS
+
+    # 大小为 k 的最小堆，堆顶即当前第 k 名的分数
+    heap = []  # (score, 序号, 轨迹)，序号避免对 dict 比较
+    order = 0
+
     for traj in trajectories:
         history_task = traj.get("task", "")
-        history_keywords = traj.get("keywords", [])
-        
+        history_keywords = tuple(traj.get("keywords_lower") or traj.get("keywords", []))
+
         if not history_task:
             continue
-        
-        score = calculate_combined_similarity(
+
+        # 堆满后先用关键词 Jaccard 上界剪枝，打不过第 k 名就跳过打分
+        if len(heap) == k:
+            kw_sim = _keyword_jaccard(
+                _kwset(current_keywords), _kwset(history_keywords)
+            )
+            if int(w1 * 100 + w2 * 100 + w3 * kw_sim) <= heap[0][0]:
+                continue
+
+        score = _combined_sim(
             user_task, history_task,
             current_keywords, history_keywords
         )
-        scored_trajectories.append((traj, score))
-    
-    # 按相似度降序排序
-    scored_trajectories.sort(key=lambda x: x[1], reverse=True)
-    
-    return scored_trajectories[:k]
+        order += 1
+
+        if len(heap) < k:
+            heapq.heappush(heap, (score, order, traj))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, order, traj))
+
+    # 按相似度降序返回
+    return [(traj, score) for score, _, traj in sorted(heap, reverse=True)]
 
 
 # ============================================================
@@ -467,7 +601,7 @@ def reuse_reasoning_chain(
     reused_reasoning["_reused_from"] = {
         "task": similar_traj.get("task"),
         "task_hash": similar_traj.get("task_hash"),
-        "timestamp": similar_traj.get("timestamp"),
+        "timestamp": format_timestamp(similar_traj),
         "success": similar_traj.get("success")
     }
     
@@ -571,7 +705,7 @@ def get_retrieval_stats() -> Dict:
     
     # 最近任务
     stats["recent_tasks"] = [
-        {"task": t.get("task", "")[:50], "timestamp": t.get("timestamp")}
+        {"task": t.get("task", "")[:50], "timestamp": format_timestamp(t)}
         for t in trajectories[:5]
     ]
     
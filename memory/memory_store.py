@@ -13,11 +13,20 @@
 
 import json
 import os
+import re
 import time
 import hashlib
+import functools
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+
+# 尝试导入 orjson（C 实现的 JSON 库，序列化比 stdlib 快数倍）
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # ============================================================
 # 存储配置
@@ -27,6 +36,128 @@ from typing import Optional, Dict, List, Any
 STORAGE_DIR = os.path.expanduser("~/.config/kylin-gui-agent/collaboration_memory")
 PREFERENCE_FILE = os.path.expanduser("~/.config/kylin-gui-agent/user_preference.json")
 
+# 每条轨迹的初始复用阈值（0-1），后续根据复用成败在线调整
+DEFAULT_ENTRY_THRESHOLD = 0.6
+
+# 轨迹摘要索引（追加写 JSONL）：list/search/stats/相似度检索只读索引，
+# 避免每次调用都 listdir + 逐个解析全部轨迹 JSON
+INDEX_FILE = os.path.join(STORAGE_DIR, "index.jsonl")
+
+# 索引进入检索的摘要字段（完整轨迹仅在真正需要 reasoning_chain 时才加载）
+_INDEX_FIELDS = (
+    "timestamp_unix_ns", "timestamp_unix", "task_hash", "task", "task_lower",
+    "keywords", "keywords_lower", "agents_involved", "success",
+    "per_entry_threshold"
+)
+
+
+def _entry_sort_key(entry: Dict) -> int:
+    """索引排序键：优先纳秒时间戳，旧条目回退到秒级"""
+    ns = entry.get("timestamp_unix_ns")
+    if ns is not None:
+        return ns
+    return (entry.get("timestamp_unix") or 0) * 1_000_000_000
+
+# 内存中的索引缓存，按索引文件的 (mtime, size) 失效
+# kw_index 为倒排索引：关键词 -> entries 中的下标集合（相似任务检索用）
+_INDEX_CACHE = {"stat": None, "entries": [], "kw_index": {}}
+
+
+def _set_index_cache(stat_key, entries: List[Dict]):
+    """刷新索引缓存，并同步重建关键词倒排索引"""
+    kw_index = {}
+    for i, entry in enumerate(entries):
+        for kw in entry.get("keywords") or []:
+            kw_index.setdefault(kw, set()).add(i)
+
+    _INDEX_CACHE["stat"] = stat_key
+    _INDEX_CACHE["entries"] = entries
+    _INDEX_CACHE["kw_index"] = kw_index
+
+# 目录列表缓存：按目录 mtime 失效，避免每次调用重复
+# listdir + 逐文件名解析时间戳再排序；hash_map 提供 O(1) 哈希→文件名
+_DIR_CACHE = {"mtime": None, "files": [], "hash_map": {}}
+
+
+def _list_trajectory_files() -> List[Tuple[int, str]]:
+    """
+    列出存储目录下的轨迹文件（按时间戳倒序，带缓存）
+
+    用 os.scandir 单次遍历，文件名里的时间戳只在目录变化时
+    解析一次；返回 (时间戳, 文件名) 元组，调用方无需再拆文件名。
+
+    Returns:
+        [(timestamp_unix, filename), ...] 按时间倒序
+    """
+    st = os.stat(STORAGE_DIR)
+    if _DIR_CACHE["mtime"] == st.st_mtime_ns:
+        return _DIR_CACHE["files"]
+
+    files = []
+    hash_map = {}
+    with os.scandir(STORAGE_DIR) as it:
+        for dirent in it:
+            name = dirent.name
+            if not name.endswith(".json"):
+                continue
+            prefix, _, rest = name.partition("_")
+            try:
+                timestamp = int(prefix)
+            except ValueError:
+                continue
+            files.append((timestamp, name))
+            # 文件名形如 {timestamp}_{task_hash}.json
+            hash_map[rest[:-5]] = name
+
+    files.sort(reverse=True)
+    _DIR_CACHE["mtime"] = st.st_mtime_ns
+    _DIR_CACHE["files"] = files
+    _DIR_CACHE["hash_map"] = hash_map
+    return files
+
+# 轨迹文件默认不缩进（机器消费）；排查问题时可设环境变量恢复缩进
+_DEBUG_JSON = os.getenv("KYLIN_MEMORY_DEBUG_JSON") == "1"
+
+
+def _write_json(file_path: str, obj: Dict):
+    """
+    一次性写出 JSON 文件
+
+    json.dump 会按 iterencode 分块逐次 write；先序列化成完整字节串
+    再单次 write 明显更快。orjson 可用时再省一层序列化开销。
+
+    Args:
+        file_path: 目标文件路径
+        obj: 要序列化的字典
+    """
+    if _DEBUG_JSON:
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    elif HAS_ORJSON:
+        data = orjson.dumps(obj)
+    else:
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+def _read_json(file_path: str) -> Dict:
+    """
+    整读并解析 JSON 文件
+
+    二进制一次性读入后交给 orjson.loads（不可用时回退 stdlib），
+    绕开文本模式缓冲层和逐块解码的开销。
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        解析后的字典
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
 # 确保存储目录存在
 os.makedirs(STORAGE_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(PREFERENCE_FILE), exist_ok=True)
@@ -36,32 +167,184 @@ os.makedirs(os.path.dirname(PREFERENCE_FILE), exist_ok=True)
 # 辅助函数
 # ============================================================
 
+@functools.lru_cache(maxsize=1024)
 def generate_task_hash(task: str) -> str:
     """
-    生成任务唯一标识（MD5哈希前8位）
-    
+    生成任务唯一标识（BLAKE2b 4 字节摘要，8 位十六进制）
+
+    仅用于文件名分桶，非加密用途。BLAKE2b 短输入比 MD5 更快，
+    且 digest_size=4 正好输出 8 位十六进制，无截断浪费；
+    同一任务串在一次请求内会被多处哈希，结果带缓存。
+
     Args:
         task: 用户任务描述
-        
+
     Returns:
         8位哈希字符串
     """
-    return hashlib.md5(task.encode('utf-8')).hexdigest()[:8]
+    return hashlib.blake2b(task.encode('utf-8'), digest_size=4).hexdigest()
 
 
 def validate_screenshot_paths(paths: List[str]) -> List[str]:
     """
     验证截图路径，只保留存在的文件
-    
+
+    长轨迹的截图通常集中在同一目录：路径较多时按目录分组，
+    每个目录只做一次 scandir 取文件名集合，用集合成员判断替代
+    逐路径的 stat 系统调用。
+
     Args:
         paths: 截图路径列表
-        
+
     Returns:
         有效的截图路径列表
     """
     if not paths:
         return []
-    return [p for p in paths if os.path.exists(p)]
+
+    # 路径很少时逐个 stat 更划算
+    if len(paths) < 4:
+        return [p for p in paths if os.path.exists(p)]
+
+    # 按目录分组，每个目录一次 scandir
+    dir_names = {}
+    for p in paths:
+        dir_names.setdefault(os.path.dirname(p), None)
+
+    for d in dir_names:
+        try:
+            with os.scandir(d or ".") as it:
+                dir_names[d] = {entry.name for entry in it}
+        except OSError:
+            dir_names[d] = None  # 目录不可读，回退到逐路径判断
+
+    valid = []
+    for p in paths:
+        names = dir_names.get(os.path.dirname(p))
+        if names is None:
+            if os.path.exists(p):
+                valid.append(p)
+        elif os.path.basename(p) in names:
+            valid.append(p)
+
+    return valid
+
+
+# ============================================================
+# 摘要索引维护
+# ============================================================
+
+def append_index_entry(trajectory: Dict, filename: str):
+    """
+    追加一条轨迹摘要到索引文件
+
+    索引是追加写的：同一 filename 的后写记录覆盖先写记录，
+    因此更新轨迹（执行结果、复用阈值）后重新追加即可刷新索引。
+
+    Args:
+        trajectory: 完整轨迹字典
+        filename: 轨迹文件名（不含目录）
+    """
+    entry = {field: trajectory.get(field) for field in _INDEX_FIELDS}
+    entry["filename"] = filename
+    with open(INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _rebuild_index() -> List[Dict]:
+    """
+    全量扫描轨迹文件重建索引（索引缺失时的一次性迁移路径）
+
+    Returns:
+        索引条目列表（按时间倒序）
+    """
+    names = [n for n in os.listdir(STORAGE_DIR) if n.endswith(".json")]
+
+    def _summarize(name: str) -> Optional[Dict]:
+        try:
+            trajectory = _read_json(os.path.join(STORAGE_DIR, name))
+        except Exception:
+            return None
+        entry = {field: trajectory.get(field) for field in _INDEX_FIELDS}
+        entry["filename"] = name
+        return entry
+
+    # 重建是全量读盘，线程池并发摊薄逐文件的 I/O 等待
+    if len(names) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(8, len(names))) as executor:
+            entries = [e for e in executor.map(_summarize, names) if e is not None]
+    else:
+        entries = [e for e in map(_summarize, names) if e is not None]
+
+    entries.sort(key=_entry_sort_key, reverse=True)
+
+    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return entries
+
+
+def _load_index() -> List[Dict]:
+    """
+    加载轨迹摘要索引（内存缓存，按索引文件 mtime/size 失效）
+
+    Returns:
+        索引条目列表（按时间倒序，同名文件只保留最后一条记录）
+    """
+    try:
+        st = os.stat(INDEX_FILE)
+        stat_key = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        entries = _rebuild_index()
+        try:
+            st = os.stat(INDEX_FILE)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        _set_index_cache(stat_key, entries)
+        return entries
+
+    if _INDEX_CACHE["stat"] == stat_key:
+        return _INDEX_CACHE["entries"]
+
+    _loads = orjson.loads if HAS_ORJSON else json.loads
+
+    by_file = {}
+    with open(INDEX_FILE, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = _loads(line)
+            except ValueError:
+                continue
+            # 后写记录覆盖先写（轨迹更新后重新追加的场景）
+            by_file[entry.get("filename")] = entry
+
+    entries = sorted(by_file.values(), key=_entry_sort_key, reverse=True)
+    _set_index_cache(stat_key, entries)
+    return entries
+
+
+def _load_full_trajectory(filename: str) -> Optional[Dict]:
+    """
+    按文件名加载完整轨迹（含 reasoning_chain 等索引外字段）
+
+    Args:
+        filename: 轨迹文件名（不含目录）
+
+    Returns:
+        轨迹字典，读取失败返回 None
+    """
+    file_path = os.path.join(STORAGE_DIR, filename)
+    try:
+        return _read_json(file_path)
+    except Exception as e:
+        print(f"读取轨迹失败 {filename}: {e}")
+        return None
 
 
 # ============================================================
@@ -92,26 +375,82 @@ def save_collaboration_trajectory(
     Returns:
         保存的文件路径
     """
+    trajectory, filename = _build_trajectory(
+        task=task,
+        reasoning_chain=reasoning_chain,
+        execution_result=execution_result,
+        screenshot_paths=screenshot_paths,
+        gui_action=gui_action,
+        success=success,
+        metadata=metadata
+    )
+    file_path = os.path.join(STORAGE_DIR, filename)
+
+    # 保存到JSON文件（整体序列化后单次写出）
+    _write_json(file_path, trajectory)
+
+    # 追加摘要到索引（检索路径只读索引，不再全量解析轨迹文件）
+    try:
+        append_index_entry(trajectory, filename)
+    except Exception as e:
+        print(f"更新索引失败: {e}")
+
+    # 更新用户偏好（异步，不阻塞）
+    try:
+        update_user_preference(trajectory)
+    except Exception as e:
+        print(f"更新用户偏好失败: {e}")
+
+    print(f"✓ 协作轨迹已保存: {file_path}")
+    return file_path
+
+
+def _build_trajectory(
+    task: str,
+    reasoning_chain: Any,
+    execution_result: str = "",
+    screenshot_paths: Optional[List[str]] = None,
+    gui_action: Optional[Dict] = None,
+    success: bool = True,
+    metadata: Optional[Dict] = None
+) -> Tuple[Dict, str]:
+    """
+    构建轨迹数据结构及其文件名（save_collaboration_trajectory / save_many 共用）
+
+    Args:
+        同 save_collaboration_trajectory
+
+    Returns:
+        (轨迹字典, 文件名)
+    """
     # 处理推理链格式
     if isinstance(reasoning_chain, str):
         try:
             reasoning_chain = json.loads(reasoning_chain)
         except json.JSONDecodeError:
             reasoning_chain = {"raw": reasoning_chain}
-    
+
     # 验证截图路径
     valid_screenshots = validate_screenshot_paths(screenshot_paths or [])
-    
-    # 提取关键信息用于检索
+
+    # 提取关键信息用于检索（智能体排序保证表示稳定）
     keywords = extract_keywords(task)
-    agents_involved = extract_agents(reasoning_chain)
-    
+    agents_involved = sorted(extract_agents(reasoning_chain))
+
+    # 纳秒时间戳：文件名天然唯一，保存路径不再付 strftime 开销
+    # （人类可读串由 format_timestamp 按需生成）
+    now_ns = time.time_ns()
+
     # 构建轨迹数据结构
     trajectory = {
         # 基本信息
         "task": task,
         "task_hash": generate_task_hash(task),
+        # 预先小写的检索表示：查询路径零计算，纯字符串/集合操作
+        "task_lower": task.lower(),
         "keywords": keywords,
+        # 预先小写去重的关键词（检索时免去逐条 lower + 建集合的开销）
+        "keywords_lower": sorted({k.lower() for k in keywords}),
         
         # 推理链
         "reasoning_chain": reasoning_chain,
@@ -127,74 +466,134 @@ def save_collaboration_trajectory(
         "screenshot_count": len(valid_screenshots),
         
         # 时间戳
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "timestamp_unix": int(time.time()),
+        "timestamp_unix_ns": now_ns,
+        "timestamp_unix": now_ns // 1_000_000_000,
         
+        # 复用阈值（按条学习：复用失败则提高，成功则小幅降低）
+        "per_entry_threshold": DEFAULT_ENTRY_THRESHOLD,
+
         # 元数据
         "metadata": metadata or {}
     }
     
-    # 生成文件名（时间戳_任务哈希.json）
-    filename = f"{trajectory['timestamp_unix']}_{trajectory['task_hash']}.json"
-    file_path = os.path.join(STORAGE_DIR, filename)
-    
-    # 保存到JSON文件
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(trajectory, f, ensure_ascii=False, indent=2)
-    
-    # 更新用户偏好（异步，不阻塞）
-    try:
-        update_user_preference(trajectory)
-    except Exception as e:
-        print(f"更新用户偏好失败: {e}")
-    
-    print(f"✓ 协作轨迹已保存: {file_path}")
-    return file_path
+    # 生成文件名（纳秒时间戳_任务哈希.json，无需 sleep 即可保证唯一）
+    filename = f"{trajectory['timestamp_unix_ns']}_{trajectory['task_hash']}.json"
+
+    return trajectory, filename
+
+
+def format_timestamp(trajectory: Dict) -> str:
+    """
+    按需生成轨迹的人类可读时间串
+
+    旧轨迹直接返回保存时写入的 timestamp 字段；新轨迹只存
+    unix 时间戳，展示时才做 strftime。
+
+    Args:
+        trajectory: 轨迹或索引条目字典
+
+    Returns:
+        "YYYY-MM-DD HH:MM:SS" 格式时间串，无时间戳返回空串
+    """
+    ts = trajectory.get("timestamp")
+    if ts:
+        return ts
+
+    unix = trajectory.get("timestamp_unix")
+    if unix is None:
+        return ""
+    return datetime.fromtimestamp(unix).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def save_many(cases: List[Dict]) -> List[str]:
+    """
+    批量保存协作轨迹（索引、用户偏好各只落盘一次）
+
+    逐条调用 save_collaboration_trajectory 时，每条轨迹都会单独
+    追加索引、读写一遍偏好文件。批量入库（如回放历史轨迹）时，
+    索引行聚合成一次追加写，偏好在内存中累计、最后统一保存。
+
+    Args:
+        cases: 参数字典列表，每项为 save_collaboration_trajectory 的关键字参数
+
+    Returns:
+        保存的文件路径列表
+    """
+    saved_paths = []
+    index_lines = []
+    preference = load_user_preference()
+
+    for case in cases:
+        trajectory, filename = _build_trajectory(**case)
+        file_path = os.path.join(STORAGE_DIR, filename)
+        _write_json(file_path, trajectory)
+
+        entry = {field: trajectory.get(field) for field in _INDEX_FIELDS}
+        entry["filename"] = filename
+        index_lines.append(json.dumps(entry, ensure_ascii=False))
+
+        try:
+            update_user_preference(trajectory, preference=preference)
+        except Exception as e:
+            print(f"更新用户偏好失败: {e}")
+
+        saved_paths.append(file_path)
+
+    if index_lines:
+        with open(INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write("\n".join(index_lines) + "\n")
+        save_user_preference(preference)
+
+    print(f"✓ 批量保存 {len(saved_paths)} 条协作轨迹")
+    return saved_paths
+
+
+# 常见操作关键词
+ACTION_KEYWORDS = [
+    "搜索", "查找", "设置", "更换", "调整", "移动", "删除", "复制",
+    "打开", "关闭", "安装", "卸载", "下载", "上传", "创建", "修改"
+]
+
+# 常见对象关键词
+OBJECT_KEYWORDS = [
+    "文件", "目录", "文件夹", "壁纸", "音量", "亮度", "网络", "蓝牙",
+    "浏览器", "终端", "应用", "程序", "图片", "文档", "视频", "音乐"
+]
+
+# 多模式匹配：把全部关键词编译成一条选择式正则，对任务文本只做
+# 一次 C 级扫描，替代逐关键词的 Python 层 `kw in task` 循环
+# （长关键词在前，保证「文件夹」优先于「文件」被整体命中）
+_KEYWORD_RE = re.compile(
+    "|".join(
+        re.escape(kw)
+        for kw in sorted(ACTION_KEYWORDS + OBJECT_KEYWORDS, key=len, reverse=True)
+    )
+)
+
+# 路径 / 文件扩展名提取模式（模块级预编译，免去每次调用的模式缓存查找）
+_PATH_RE = re.compile(r'[~/\w]+/\w+')
+_EXT_RE = re.compile(r'\.\w+')
 
 
 def extract_keywords(task: str) -> List[str]:
     """
     从任务描述中提取关键词
-    
+
     Args:
         task: 用户任务描述
-        
+
     Returns:
         关键词列表
     """
-    # 常见操作关键词
-    action_keywords = [
-        "搜索", "查找", "设置", "更换", "调整", "移动", "删除", "复制",
-        "打开", "关闭", "安装", "卸载", "下载", "上传", "创建", "修改"
-    ]
-    
-    # 常见对象关键词
-    object_keywords = [
-        "文件", "目录", "文件夹", "壁纸", "音量", "亮度", "网络", "蓝牙",
-        "浏览器", "终端", "应用", "程序", "图片", "文档", "视频", "音乐"
-    ]
-    
-    keywords = []
-    
-    # 提取操作关键词
-    for kw in action_keywords:
-        if kw in task:
-            keywords.append(kw)
-    
-    # 提取对象关键词
-    for kw in object_keywords:
-        if kw in task:
-            keywords.append(kw)
-    
+    # 单次扫描提取操作/对象关键词
+    keywords = _KEYWORD_RE.findall(task)
+
     # 提取路径（如 ~/Downloads）
-    import re
-    paths = re.findall(r'[~/\w]+/\w+', task)
-    keywords.extend(paths)
-    
+    keywords.extend(_PATH_RE.findall(task))
+
     # 提取文件扩展名（如 .png, .tmp）
-    extensions = re.findall(r'\.\w+', task)
-    keywords.extend(extensions)
-    
+    keywords.extend(_EXT_RE.findall(task))
+
     return list(set(keywords))  # 去重
 
 
@@ -231,6 +630,27 @@ def extract_agents(reasoning_chain: Dict) -> List[str]:
 # 检索函数
 # ============================================================
 
+def _iter_trajectories(success_only: bool = False):
+    """
+    惰性遍历协作轨迹（按时间倒序逐条产出）
+
+    调用方提前 break 即停止读盘：消费 k 条只打开 k 个轨迹文件。
+    一次性取定量数据用 list_trajectories（线程池并行加载更快）。
+
+    Args:
+        success_only: 是否只产出成功的轨迹
+
+    Yields:
+        完整轨迹字典
+    """
+    for entry in _load_index():
+        if success_only and not entry.get("success", False):
+            continue
+        traj = _load_full_trajectory(entry["filename"])
+        if traj is not None:
+            yield traj
+
+
 def list_trajectories(limit: int = 10, success_only: bool = False) -> List[Dict]:
     """
     列出最近的协作轨迹（按时间倒序）
@@ -242,29 +662,30 @@ def list_trajectories(limit: int = 10, success_only: bool = False) -> List[Dict]
     Returns:
         轨迹列表
     """
-    # 获取所有轨迹文件
-    trajectory_files = [f for f in os.listdir(STORAGE_DIR) if f.endswith(".json")]
-    
-    # 按时间戳倒序排序
-    trajectory_files.sort(reverse=True, key=lambda x: int(x.split("_")[0]))
-    
-    # 读取轨迹
-    trajectories = []
-    for file in trajectory_files:
-        if len(trajectories) >= limit:
+    # 基于摘要索引筛选（过滤不命中的条目无需打开轨迹文件）
+    selected = []
+    for entry in _load_index():
+        if len(selected) >= limit:
             break
-            
-        file_path = os.path.join(STORAGE_DIR, file)
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                traj = json.load(f)
-                if success_only and not traj.get("success", False):
-                    continue
-                trajectories.append(traj)
-        except Exception as e:
-            print(f"读取轨迹失败 {file}: {e}")
-    
-    return trajectories
+        if success_only and not entry.get("success", False):
+            continue
+        selected.append(entry["filename"])
+
+    if not selected:
+        return []
+
+    # 单文件直接读；多文件用线程池重叠打开/读取的阻塞时间
+    if len(selected) == 1:
+        traj = _load_full_trajectory(selected[0])
+        return [traj] if traj is not None else []
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(8, len(selected))) as executor:
+        results = list(executor.map(_load_full_trajectory, selected))
+
+    # map 保持 selected 的顺序（时间倒序），只剔除读取失败的
+    return [traj for traj in results if traj is not None]
 
 
 def search_trajectories(
@@ -283,27 +704,41 @@ def search_trajectories(
     Returns:
         匹配的轨迹列表
     """
-    all_trajectories = list_trajectories(limit=1000)  # 获取所有轨迹
-    
+    # 查询词只小写一次，不在循环里反复转换
+    kw_lower = keyword.lower() if keyword else None
+
+    # 在摘要索引上过滤，只为命中的条目加载完整轨迹
     matched = []
-    for traj in all_trajectories:
+    for entry in _load_index():
         if len(matched) >= limit:
             break
-        
+
         # 关键词匹配
-        if keyword:
-            task_match = keyword.lower() in traj.get("task", "").lower()
-            keywords_match = keyword.lower() in " ".join(traj.get("keywords", [])).lower()
-            if not (task_match or keywords_match):
-                continue
-        
+        if kw_lower:
+            # 保存时已持久化小写任务串；旧条目首次参与搜索时补算并缓存
+            task_lower = entry.get("task_lower")
+            if task_lower is None:
+                task_lower = (entry.get("task") or "").lower()
+                entry["task_lower"] = task_lower
+
+            if kw_lower not in task_lower:
+                # 关键词逐个判断，命中即短路（保存时已预先小写）
+                keywords_lower = entry.get("keywords_lower")
+                if keywords_lower is None:
+                    keywords_lower = [k.lower() for k in entry.get("keywords") or []]
+                    entry["keywords_lower"] = keywords_lower
+                if not any(kw_lower in k for k in keywords_lower):
+                    continue
+
         # 智能体匹配
         if agent:
-            if agent not in traj.get("agents_involved", []):
+            if agent not in (entry.get("agents_involved") or []):
                 continue
-        
-        matched.append(traj)
-    
+
+        traj = _load_full_trajectory(entry["filename"])
+        if traj is not None:
+            matched.append(traj)
+
     return matched
 
 
@@ -321,32 +756,87 @@ def find_similar_task(task: str, threshold: float = 0.5) -> Optional[Dict]:
     current_keywords = set(extract_keywords(task))
     if not current_keywords:
         return None
-    
-    all_trajectories = list_trajectories(limit=100, success_only=True)
-    
-    best_match = None
+
+    # 通过关键词倒排索引取候选集：没有任何关键词重叠的轨迹
+    # Jaccard 必为 0，直接跳过，不参与打分
+    entries = _load_index()
+    kw_index = _INDEX_CACHE["kw_index"]
+
+    candidate_ids = set()
+    for kw in current_keywords:
+        candidate_ids |= kw_index.get(kw, set())
+
+    best_entry = None
     best_score = 0
-    
-    for traj in all_trajectories:
-        traj_keywords = set(traj.get("keywords", []))
-        if not traj_keywords:
+
+    # 下标升序 = 时间倒序，同分时优先较新的轨迹
+    for idx in sorted(candidate_ids):
+        entry = entries[idx]
+        if not entry.get("success", False):
             continue
-        
+
+        traj_keywords = set(entry.get("keywords") or [])
+
         # 计算Jaccard相似度
         intersection = len(current_keywords & traj_keywords)
         union = len(current_keywords | traj_keywords)
         similarity = intersection / union if union > 0 else 0
-        
+
         if similarity > best_score and similarity >= threshold:
             best_score = similarity
-            best_match = traj
-    
+            best_entry = entry
+
+    if not best_entry:
+        return None
+
+    best_match = _load_full_trajectory(best_entry["filename"])
     if best_match:
         print(f"✓ 找到相似任务 (相似度: {best_score:.2f}): {best_match['task'][:50]}...")
-    
+
     return best_match
 
 
+def adjust_entry_threshold(task_hash: str, success: bool) -> Optional[float]:
+    """
+    根据复用反馈在线调整源轨迹的复用阈值（vCache 式在线学习）
+
+    复用该轨迹的推理链执行失败时提高其阈值（下次更难被复用），
+    执行成功时小幅降低（提升安全命中率）。
+
+    Args:
+        task_hash: 源轨迹的任务哈希
+        success: 复用后的执行是否成功
+
+    Returns:
+        调整后的阈值，未找到轨迹或更新失败返回 None
+    """
+    for _, file in _list_trajectory_files():
+        if task_hash in file:
+            file_path = os.path.join(STORAGE_DIR, file)
+            try:
+                trajectory = _read_json(file_path)
+
+                t_old = trajectory.get("per_entry_threshold", DEFAULT_ENTRY_THRESHOLD)
+                if success:
+                    t_new = max(0.5, t_old - 0.01)
+                else:
+                    t_new = min(0.99, t_old + 0.05)
+                trajectory["per_entry_threshold"] = t_new
+
+                _write_json(file_path, trajectory)
+
+                # 重新追加索引记录，刷新摘要里的阈值
+                append_index_entry(trajectory, file)
+
+                print(f"✓ 复用阈值已调整: {t_old:.2f} → {t_new:.2f} ({file})")
+                return t_new
+            except Exception as e:
+                print(f"调整复用阈值失败: {e}")
+                return None
+
+    return None
+
+
 def get_trajectory_by_hash(task_hash: str) -> Optional[Dict]:
     """
     根据任务哈希获取轨迹
@@ -357,14 +847,12 @@ def get_trajectory_by_hash(task_hash: str) -> Optional[Dict]:
     Returns:
         轨迹字典
     """
-    trajectory_files = [f for f in os.listdir(STORAGE_DIR) if f.endswith(".json")]
-    
-    for file in trajectory_files:
-        if task_hash in file:
-            file_path = os.path.join(STORAGE_DIR, file)
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    
+    _list_trajectory_files()  # 确保哈希映射是最新的
+
+    file = _DIR_CACHE["hash_map"].get(task_hash)
+    if file:
+        return _read_json(os.path.join(STORAGE_DIR, file))
+
     return None
 
 
@@ -379,24 +867,19 @@ def get_memory_stats() -> Dict:
     Returns:
         统计信息字典
     """
-    trajectory_files = [f for f in os.listdir(STORAGE_DIR) if f.endswith(".json")]
-    
-    total_count = len(trajectory_files)
+    # 全部统计字段都在摘要索引里，零轨迹文件解析
+    entries = _load_index()
+
+    total_count = len(entries)
     success_count = 0
     agent_counts = {}
-    
-    for file in trajectory_files:
-        file_path = os.path.join(STORAGE_DIR, file)
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                traj = json.load(f)
-                if traj.get("success", False):
-                    success_count += 1
-                for agent in traj.get("agents_involved", []):
-                    agent_counts[agent] = agent_counts.get(agent, 0) + 1
-        except:
-            pass
-    
+
+    for entry in entries:
+        if entry.get("success", False):
+            success_count += 1
+        for agent in entry.get("agents_involved") or []:
+            agent_counts[agent] = agent_counts.get(agent, 0) + 1
+
     return {
         "total_trajectories": total_count,
         "success_count": success_count,
@@ -416,22 +899,33 @@ def clear_old_trajectories(days: int = 30) -> int:
     Returns:
         删除的文件数量
     """
-    cutoff_time = int(time.time()) - (days * 24 * 60 * 60)
-    trajectory_files = [f for f in os.listdir(STORAGE_DIR) if f.endswith(".json")]
-    
+    cutoff_time = time.time() - days * 86400
+
+    # 直接读 scandir 缓存在 DirEntry 里的 st_mtime，不解析文件名
     deleted_count = 0
-    for file in trajectory_files:
-        try:
-            timestamp = int(file.split("_")[0])
-            if timestamp < cutoff_time:
-                os.remove(os.path.join(STORAGE_DIR, file))
-                deleted_count += 1
-        except:
-            pass
-    
+    deleted_files = set()
+    with os.scandir(STORAGE_DIR) as it:
+        for dirent in it:
+            if not dirent.name.endswith(".json"):
+                continue
+            try:
+                if dirent.stat().st_mtime < cutoff_time:
+                    os.remove(dirent.path)
+                    deleted_files.add(dirent.name)
+                    deleted_count += 1
+            except OSError:
+                pass
+
+    # 同步重写索引并失效缓存，其余调用方无需再 listdir
     if deleted_count > 0:
+        remaining = [e for e in _load_index() if e.get("filename") not in deleted_files]
+        with open(INDEX_FILE, "w", encoding="utf-8") as f:
+            for entry in remaining:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        _INDEX_CACHE["stat"] = None
+        _DIR_CACHE["mtime"] = None
         print(f"已清理 {deleted_count} 条过期轨迹")
-    
+
     return deleted_count
 
 
@@ -542,25 +1036,15 @@ def test_memory_store():
         }
     ]
     
-    # 保存测试轨迹
+    # 批量保存测试轨迹（索引/偏好只落盘一次）
     print("\n--- 保存测试轨迹 ---")
-    saved_paths = []
-    for i, case in enumerate(test_cases, 1):
-        print(f"\n测试 {i}: {case['task'][:40]}...")
-        path = save_collaboration_trajectory(
-            task=case["task"],
-            reasoning_chain=case["reasoning_chain"],
-            execution_result=case["execution_result"],
-            success=case["success"]
-        )
-        saved_paths.append(path)
-        time.sleep(1)  # 确保时间戳不同
+    saved_paths = save_many(test_cases)
     
     # 测试列表功能
     print("\n--- 列出最近轨迹 ---")
     recent = list_trajectories(limit=3)
     for traj in recent:
-        print(f"  • {traj['task'][:40]}... [{traj['timestamp']}]")
+        print(f"  • {traj['task'][:40]}... [{format_timestamp(traj)}]")
     
     # 测试搜索功能
     print("\n--- 关键词搜索测试 ---")
@@ -643,19 +1127,22 @@ def save_user_preference(preference: Dict):
         json.dump(preference, f, ensure_ascii=False, indent=2)
 
 
-def update_user_preference(trajectory: Dict):
+def update_user_preference(trajectory: Dict, preference: Optional[Dict] = None):
     """
     根据轨迹更新用户偏好
-    
+
     Args:
         trajectory: 协作轨迹字典
+        preference: 已加载的偏好字典；传入时只在内存中累计，
+            由调用方统一保存（批量入库路径用）
     """
-    preference = load_user_preference()
+    deferred = preference is not None
+    if preference is None:
+        preference = load_user_preference()
     
     # 1. 提取常用路径（出现≥3次标记为常用）
     task = trajectory.get("task", "")
-    import re
-    paths = re.findall(r'[~/\w]+/\w+', task)
+    paths = _PATH_RE.findall(task)
     for path in paths:
         normalized_path = os.path.expanduser(path) if path.startswith("~") else path
         preference["path_frequency"][normalized_path] = preference["path_frequency"].get(normalized_path, 0) + 1
@@ -690,8 +1177,9 @@ def update_user_preference(trajectory: Dict):
     for agent in agents:
         preference["agent_preferences"][agent] = preference["agent_preferences"].get(agent, 0) + 1
     
-    # 保存偏好
-    save_user_preference(preference)
+    # 保存偏好（批量路径由调用方统一落盘）
+    if not deferred:
+        save_user_preference(preference)
 
 
 def get_user_preference_prompt() -> str:
@@ -24,16 +24,15 @@ except ImportError:
     print("提示: networkx 未安装，可视化功能不可用")
     print("安装命令: pip install networkx")
 
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib
-    matplotlib.use('Agg')  # 非交互式后端
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
+# matplotlib 推迟到真正渲染时才导入：
+# find_spec 只探测不导入，纯统计/筛选路径不付字体缓存+numpy 的数百毫秒导入成本
+import importlib.util
+
+HAS_MATPLOTLIB = importlib.util.find_spec("matplotlib") is not None
+if not HAS_MATPLOTLIB:
     print("提示: matplotlib 未安装，可视化功能不可用")
 
-from memory_store import list_trajectories, STORAGE_DIR
+from memory_store import list_trajectories, format_timestamp, STORAGE_DIR
 
 
 def build_trajectory_graph(
@@ -89,7 +88,7 @@ def build_trajectory_graph(
         # 添加任务节点
         task_id = f"task_{task_hash}"
         G.add_node(task_id, type="task", label=task[:30] + "..." if len(task) > 30 else task, 
-                   success=traj.get("success", False), timestamp=traj.get("timestamp", ""))
+                   success=traj.get("success", False), timestamp=format_timestamp(traj))
         
         # 添加智能体节点和边
         for agent in agents:
@@ -132,8 +131,9 @@ def visualize_graph_to_html(
         return "<p>可视化功能不可用（需要安装networkx）</p>"
     
     try:
+        import matplotlib
+        matplotlib.use('Agg')  # 非交互式后端，只保存文件
         import matplotlib.pyplot as plt
-        from matplotlib import cm
         import base64
         from io import BytesIO
         
@@ -238,7 +238,7 @@ def get_trajectory_summary(trajectories: List[Dict]) -> Dict:
     summary["recent_tasks"] = [
         {
             "task": t.get("task", "")[:50],
-            "timestamp": t.get("timestamp", ""),
+            "timestamp": format_timestamp(t),
             "success": t.get("success", False)
         }
         for t in trajectories[:10]
@@ -13,6 +13,7 @@ System-2 推理与记忆整合模块
 """
 
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List, Any, Tuple
@@ -33,7 +34,10 @@ from memory_store import (
     list_trajectories,
     search_trajectories,
     find_similar_task,
+    format_timestamp,
     get_memory_stats,
+    adjust_entry_threshold,
+    append_index_entry,
     STORAGE_DIR
 )
 
@@ -188,7 +192,7 @@ def try_reuse_reasoning(
         reused_chain["_reused_from"] = {
             "task": similar["task"],
             "task_hash": similar.get("task_hash"),
-            "timestamp": similar.get("timestamp"),
+            "timestamp": format_timestamp(similar),
             "success": similar.get("success", False)
         }
         return reused_chain
@@ -259,16 +263,22 @@ def reasoning_with_memory(
     # Step 3: MCP 格式校验和标准化
     if verbose:
         print("\n--- Step 3: MCP 格式校验 ---")
-    
-    is_valid, msg = validate_for_mcp(reasoning_chain)
-    if not is_valid:
+
+    if reused and reasoning_chain.get("_reused_from"):
+        # 复用链来自已存储的轨迹，存储前已通过校验/标准化
+        # （metadata.mcp_validated 恒为 True），无需重复校验
         if verbose:
-            print(f"⚠️ 格式不符合 MCP 要求: {msg}")
-            print("  正在标准化...")
-        reasoning_chain = normalize_for_mcp(reasoning_chain)
+            print("✓ 复用链存储前已校验，跳过")
     else:
-        if verbose:
-            print(f"✓ {msg}")
+        is_valid, msg = validate_for_mcp(reasoning_chain)
+        if not is_valid:
+            if verbose:
+                print(f"⚠️ 格式不符合 MCP 要求: {msg}")
+                print("  正在标准化...")
+            reasoning_chain = normalize_for_mcp(reasoning_chain)
+        else:
+            if verbose:
+                print(f"✓ {msg}")
     
     # Step 4: 生成 GUI 操作（如果提供了截图）
     gui_action = None
@@ -336,6 +346,11 @@ def reasoning_with_memory(
 # Master Agent 调用接口
 # ============================================================
 
+# 对外暴露的推理链字段（MCP 核心字段），按固定键选取
+# 避免每次调用遍历全部键做 startswith 过滤
+_PUBLIC_CHAIN_KEYS = ("thought_chain", "execution_plan", "milestone_markers")
+
+
 def get_reasoning_for_master(
     user_task: str,
     enable_reuse: bool = True,
@@ -358,10 +373,8 @@ def get_reasoning_for_master(
         verbose=verbose
     )
     
-    # 清理内部字段
-    clean_chain = {k: v for k, v in reasoning_chain.items() if not k.startswith("_")}
-    
-    return clean_chain
+    # 只挑选公开字段，内部 _ 前缀元数据（如 _reused_from）自然被排除
+    return {k: reasoning_chain[k] for k in _PUBLIC_CHAIN_KEYS if k in reasoning_chain}
 
 
 def get_next_action_for_master(
@@ -389,10 +402,11 @@ def get_next_action_for_master(
         verbose=verbose
     )
     
-    # 清理内部字段
-    clean_action = {k: v for k, v in gui_action.items() if not k.startswith("_")}
-    
-    return clean_action
+    # 清理内部字段（常见情况无内部字段，免去无谓的整字典重建）
+    if any(k.startswith("_") for k in gui_action):
+        gui_action = {k: v for k, v in gui_action.items() if not k.startswith("_")}
+
+    return gui_action
 
 
 def update_trajectory_result(
@@ -436,8 +450,23 @@ def update_trajectory_result(
                 # 保存
                 with open(file_path, "w", encoding="utf-8") as f:
                     json.dump(trajectory, f, ensure_ascii=False, indent=2)
-                
+
+                # 刷新摘要索引里的 success 等字段
+                try:
+                    append_index_entry(trajectory, file)
+                except Exception as e:
+                    print(f"更新索引失败: {e}")
+
                 print(f"✓ 轨迹已更新: {file_path}")
+
+                # 复用反馈：若该推理链是复用来的，回调整来源轨迹的复用阈值
+                # （失败提高门槛避免不安全复用，成功小幅降低提升命中率）
+                if trajectory.get("metadata", {}).get("reused"):
+                    source = trajectory.get("reasoning_chain", {}).get("_reused_from", {})
+                    source_hash = source.get("task_hash")
+                    if source_hash:
+                        adjust_entry_threshold(source_hash, success)
+
                 return True
             except Exception as e:
                 print(f"更新轨迹失败: {e}")
@@ -453,37 +482,49 @@ def update_trajectory_result(
 
 def batch_reasoning(
     tasks: List[str],
-    verbose: bool = True
+    verbose: bool = True,
+    max_workers: int = 8
 ) -> List[Dict]:
     """
-    批量生成推理链
-    
+    批量生成推理链（线程池并发，重叠各任务的 LLM/API 等待时间）
+
+    每个任务的耗时主要在 vLLM 调用和磁盘 I/O 上（IO 密集），
+    串行执行会让 API 等待时间线性累加。这里用线程池并发提交，
+    按提交顺序收集结果，保证返回顺序与 tasks 一致。
+
     Args:
         tasks: 任务列表
-        verbose: 是否打印详细信息
-        
+        verbose: 是否打印批量进度（单任务内部日志会被关闭，避免交错输出）
+        max_workers: 并发线程数
+
     Returns:
-        推理链列表
+        推理链列表（顺序与 tasks 一致）
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     results = []
-    
-    for i, task in enumerate(tasks, 1):
-        if verbose:
-            print(f"\n\n{'#' * 70}")
-            print(f"# 批量任务 {i}/{len(tasks)}: {task[:50]}...")
-            print(f"{'#' * 70}")
-        
-        reasoning_chain, trajectory_path = reasoning_with_memory(
-            user_task=task,
-            verbose=verbose
-        )
-        
-        results.append({
-            "task": task,
-            "reasoning_chain": reasoning_chain,
-            "trajectory_path": trajectory_path
-        })
-    
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 按顺序提交，futures 列表保持与 tasks 的对应关系
+        futures = [
+            executor.submit(reasoning_with_memory, user_task=task, verbose=False)
+            for task in tasks
+        ]
+
+        for i, (task, future) in enumerate(zip(tasks, futures), 1):
+            if verbose:
+                print(f"\n{'#' * 70}")
+                print(f"# 批量任务 {i}/{len(tasks)}: {task[:50]}...")
+                print(f"{'#' * 70}")
+
+            reasoning_chain, trajectory_path = future.result()
+
+            results.append({
+                "task": task,
+                "reasoning_chain": reasoning_chain,
+                "trajectory_path": trajectory_path
+            })
+
     return results
 
 
@@ -491,30 +532,61 @@ def batch_reasoning(
 # 状态查询
 # ============================================================
 
+# 健康检查缓存：TTL 内复用上次探测结果，避免每次状态刷新都
+# 阻塞在 HTTP 往返上（服务异常时最坏要等满超时）
+HEALTH_TTL = 10.0
+_HEALTH_CACHE = {"ok": False, "ts": 0.0}
+_HEALTH_SESSION = None
+
+
+def check_api_health(timeout: float = 5, force: bool = False) -> bool:
+    """
+    检查 vLLM API 健康状态（带 TTL 缓存和连接复用）
+
+    Args:
+        timeout: HTTP 超时（秒）
+        force: 是否强制探测（忽略缓存）
+
+    Returns:
+        API 是否可用
+    """
+    global _HEALTH_SESSION
+
+    now = time.time()
+    if not force and now - _HEALTH_CACHE["ts"] < HEALTH_TTL:
+        return _HEALTH_CACHE["ok"]
+
+    import requests
+
+    # 复用同一个 Session，避免每次探测重建 TCP 连接
+    if _HEALTH_SESSION is None:
+        _HEALTH_SESSION = requests.Session()
+
+    ok = False
+    try:
+        response = _HEALTH_SESSION.get(f"{API_BASE}/health", timeout=timeout)
+        ok = response.status_code == 200
+    except:
+        ok = False
+
+    _HEALTH_CACHE["ok"] = ok
+    _HEALTH_CACHE["ts"] = now
+    return ok
+
+
 def get_system_status() -> Dict:
     """
     获取系统状态（用于 Gradio 界面展示）
-    
+
     Returns:
         系统状态字典
     """
-    import requests
-    
-    status = {
-        "api_available": False,
+    return {
+        "api_available": check_api_health(),
         "api_base": API_BASE,
         "memory_stats": get_memory_stats(),
         "timestamp": datetime.now().isoformat()
     }
-    
-    # 检查 API 状态
-    try:
-        response = requests.get(f"{API_BASE}/health", timeout=5)
-        status["api_available"] = response.status_code == 200
-    except:
-        pass
-    
-    return status
 
 
 # ============================================================
@@ -523,22 +595,15 @@ def get_system_status() -> Dict:
 
 def test_api_health():
     """检查 API 服务状态"""
-    import requests
-    
     print("=" * 60)
     print("检查 vLLM API 服务状态")
     print("=" * 60)
-    
-    try:
-        response = requests.get(f"{API_BASE}/health", timeout=10)
-        if response.status_code == 200:
-            print("✓ API 服务正常")
-            return True
-        else:
-            print(f"✗ API 服务异常: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"✗ 无法连接 API 服务: {e}")
+
+    if check_api_health(timeout=10):
+        print("✓ API 服务正常")
+        return True
+    else:
+        print("✗ API 服务不可用")
         return False
 
 
@@ -15,6 +15,19 @@ from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
 
+# 预编译的热路径正则（每次调用省去 re 缓存查找；非捕获组不构建分组元组）
+_APP_NAME_RE = re.compile(r'firefox|chrome|微信|终端')
+_MEDIA_EXT_RE = re.compile(r'\.(?:mp4|mp3|avi|mkv)')
+
+# 依赖检查：合并正则一次扫描，命中词查表取 (工具, 功能名)
+_DEP_RE = re.compile(r'蓝牙|wifi|代理')
+_DEP_INFO = {
+    "蓝牙": ("settings_agent.bluetooth_manage", "蓝牙功能"),
+    "wifi": ("network_agent.connect_wifi", "WiFi功能"),
+    "代理": ("network_agent.set_proxy", "网络代理功能"),
+}
+
+
 class InstructionIssueType(Enum):
     """指令问题类型"""
     MISSING_PARAMS = "missing_params"  # 参数缺失
@@ -144,6 +157,72 @@ AMBIGUOUS_PATTERNS = {
 }
 
 
+def _build_keyword_trie(keyword_map: Dict[str, set]) -> Dict:
+    """
+    把 关键词 -> 工具集合 的映射构建成字符级 trie
+
+    None 键标记词尾，挂对应的工具集合。中文无词边界，
+    按字符建树即可支持任意子串匹配。
+    """
+    trie = {}
+    for keyword, tools in keyword_map.items():
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, set()).update(tools)
+    return trie
+
+
+def _scan_keyword_trie(trie: Dict, text: str) -> set:
+    """
+    单遍扫描文本，返回命中关键词对应的工具集合
+
+    对每个起点沿 trie 下行（Aho-Corasick 的简化形式：关键词少且短，
+    无需失配指针），总开销 O(len(text) × 最长关键词)，
+    替代逐工具逐关键词的 `kw in text` 多遍扫描。
+    """
+    hits = set()
+    n = len(text)
+    for i in range(n):
+        node = trie
+        for j in range(i, n):
+            node = node.get(text[j])
+            if node is None:
+                break
+            terminal = node.get(None)
+            if terminal:
+                hits.update(terminal)
+    return hits
+
+
+# 中文触发词 -> 工具 倒排索引（手工维护）
+# 工具描述中英混排且中文无词边界，description.split() 既切不出
+# 有效关键词也漏判常见说法，这里直接维护触发子串
+TOOL_TRIGGERS = {
+    "重命名": ["file_agent.batch_rename"],
+    "搜索": ["file_agent.search_file"],
+    "回收站": ["file_agent.move_to_trash"],
+    "蓝牙": ["settings_agent.bluetooth_manage"],
+    "壁纸": ["settings_agent.change_wallpaper"],
+    "音量": ["settings_agent.adjust_volume"],
+    "测速": ["network_agent.speed_test"],
+    "wifi": ["network_agent.connect_wifi"],
+    "应用": ["app_agent.launch_app"],
+    "播放": ["media_agent.play_media"],
+}
+
+# 导入时建好 trie，检查函数里只做一次线性扫描
+_TOOL_KEYWORD_TRIE = _build_keyword_trie(
+    {keyword: set(tools) for keyword, tools in TOOL_TRIGGERS.items()}
+)
+
+# 模糊指令模式合并为单个选择分支正则：一次扫描替代逐模式子串搜索
+# （长模式在前，避免短模式抢先命中其前缀）
+_AMBIGUOUS_RE = re.compile("|".join(
+    re.escape(p) for p in sorted(AMBIGUOUS_PATTERNS, key=len, reverse=True)
+))
+
+
 def check_instruction_completeness(
     user_task: str,
     reasoning_chain: Optional[Dict] = None
@@ -169,11 +248,10 @@ def check_instruction_completeness(
     """
     user_task_lower = user_task.lower()
     
-    # 1. 检查参数缺失
+    # 1. 检查参数缺失（trie 单遍扫描筛出候选工具，再按定义顺序逐个检查）
+    candidate_tools = _scan_keyword_trie(_TOOL_KEYWORD_TRIE, user_task_lower)
     for tool_name, tool_info in TOOL_PARAMETERS.items():
-        # 检查是否涉及该工具
-        tool_keywords = tool_info["description"]
-        if any(kw in user_task_lower for kw in tool_keywords.split()):
+        if tool_name in candidate_tools:
             missing_params = []
             required_params = tool_info["required"]
             
@@ -185,9 +263,9 @@ def check_instruction_completeness(
                     missing_params.append(param)
                 elif param == "ssid" and "wifi" in user_task_lower and "ssid" not in user_task_lower:
                     missing_params.append(param)
-                elif param == "app_name" and "应用" in user_task and not re.search(r'(firefox|chrome|微信|终端)', user_task):
+                elif param == "app_name" and "应用" in user_task and not _APP_NAME_RE.search(user_task):
                     missing_params.append(param)
-                elif param == "media_path" and "播放" in user_task and not re.search(r'\.(mp4|mp3|avi|mkv)', user_task_lower):
+                elif param == "media_path" and "播放" in user_task and not _MEDIA_EXT_RE.search(user_task_lower):
                     missing_params.append(param)
             
             if missing_params:
@@ -200,32 +278,28 @@ def check_instruction_completeness(
                     "suggestion": _generate_suggestion(tool_name, missing_params)
                 }
     
-    # 2. 检查指令歧义
-    for pattern, info in AMBIGUOUS_PATTERNS.items():
-        if pattern in user_task:
-            return False, {
-                "issue_type": InstructionIssueType.AMBIGUOUS,
-                "tool": info["tool"],
-                "questions": info["questions"],
-                "suggestion": f"请补充以下信息：{'; '.join(info['questions'])}"
-            }
+    # 2. 检查指令歧义（合并正则单遍扫描，命中后查表取元数据）
+    ambiguous_match = _AMBIGUOUS_RE.search(user_task)
+    if ambiguous_match:
+        info = AMBIGUOUS_PATTERNS[ambiguous_match.group(0)]
+        return False, {
+            "issue_type": InstructionIssueType.AMBIGUOUS,
+            "tool": info["tool"],
+            "questions": info["questions"],
+            "suggestion": f"请补充以下信息：{'; '.join(info['questions'])}"
+        }
     
     # 3. 检查依赖缺失（需要先检查系统状态）
-    dependency_checks = [
-        ("蓝牙", "settings_agent.bluetooth_manage", "蓝牙功能"),
-        ("wifi", "network_agent.connect_wifi", "WiFi功能"),
-        ("代理", "network_agent.set_proxy", "网络代理功能"),
-    ]
-    
-    for keyword, tool, feature_name in dependency_checks:
-        if keyword in user_task_lower:
-            # 这里可以调用实际的系统检查，暂时返回提示
-            return False, {
-                "issue_type": InstructionIssueType.MISSING_DEPENDENCY,
-                "tool": tool,
-                "questions": [f"是否先检查{feature_name}状态？"],
-                "suggestion": f"建议先检查{feature_name}是否已开启"
-            }
+    dep_match = _DEP_RE.search(user_task_lower)
+    if dep_match:
+        tool, feature_name = _DEP_INFO[dep_match.group(0)]
+        # 这里可以调用实际的系统检查，暂时返回提示
+        return False, {
+            "issue_type": InstructionIssueType.MISSING_DEPENDENCY,
+            "tool": tool,
+            "questions": [f"是否先检查{feature_name}状态？"],
+            "suggestion": f"建议先检查{feature_name}是否已开启"
+        }
     
     return True, None
 
@@ -270,6 +344,18 @@ def _generate_suggestion(tool_name: str, missing_params: List[str]) -> str:
         return f"请补充{', '.join(missing_params)}参数"
 
 
+# 参数名 -> 指令片段标签（complete_instruction 查表分发）
+_PARAM_LABELS = {
+    "target_dir": "目标目录",
+    "rename_rule": "重命名规则",
+    "file_type": "文件类型",
+    "ssid": "WiFi名称",
+    "password": "密码",
+    "app_name": "应用",
+    "media_path": "文件路径",
+}
+
+
 def complete_instruction(
     original_task: str,
     user_responses: Dict[str, str]
@@ -284,26 +370,14 @@ def complete_instruction(
     Returns:
         补全后的完整指令
     """
-    completed_task = original_task
-    
-    # 将用户响应合并到原始指令中
-    for param, value in user_responses.items():
-        if param == "target_dir":
-            completed_task += f"，目标目录：{value}"
-        elif param == "rename_rule":
-            completed_task += f"，重命名规则：{value}"
-        elif param == "file_type":
-            completed_task += f"，文件类型：{value}"
-        elif param == "ssid":
-            completed_task += f"，WiFi名称：{value}"
-        elif param == "password":
-            completed_task += f"，密码：{value}"
-        elif param == "app_name":
-            completed_task += f"，应用：{value}"
-        elif param == "media_path":
-            completed_task += f"，文件路径：{value}"
-    
-    return completed_task
+    # 将用户响应合并到原始指令中（查表 + 一次 join，替代逐段字符串拼接）
+    parts = [original_task]
+    parts.extend(
+        f"，{_PARAM_LABELS[param]}：{value}"
+        for param, value in user_responses.items()
+        if param in _PARAM_LABELS
+    )
+    return "".join(parts)
 
 
 # ============================================================
@@ -26,6 +26,14 @@ class PermissionLevel(Enum):
     GUEST = "guest"  # 访客：受限操作
 
 
+# 权限级别 -> 允许操作集合（check_permission 一次哈希查找替代 if/elif 链）
+_PERMISSION_ACTIONS = {
+    PermissionLevel.ADMIN: frozenset({"read", "write", "admin"}),
+    PermissionLevel.NORMAL: frozenset({"read", "write"}),
+    PermissionLevel.READONLY: frozenset({"read"}),
+    PermissionLevel.GUEST: frozenset(),
+}
+
 # 配置目录
 CONFIG_DIR = os.path.expanduser("~/.config/kylin-gui-agent/mcp_config")
 BACKUP_DIR = os.path.expanduser("~/.config/kylin-gui-agent/mcp_config/backups")
@@ -34,6 +42,10 @@ os.makedirs(BACKUP_DIR, exist_ok=True)
 
 CONFIG_FILE = os.path.join(CONFIG_DIR, "mcp_config.json")
 
+# 已解析配置的模块级缓存（按文件 mtime/size 失效）
+# 进程内重复构建管理器或恢复配置时，文件未变则跳过读盘+解析
+_CONFIG_CACHE = {"stat": None, "config": None}
+
 
 class MCPConfigManager:
     """MCP配置管理器"""
@@ -41,6 +53,11 @@ class MCPConfigManager:
     def __init__(self):
         """初始化配置管理器"""
         self.config: Dict = self._load_config()
+        # 内存配置相对磁盘是否有改动（无改动时 save_config 直接返回）
+        self._dirty = False
+        # 权限解析缓存：agent_name -> PermissionLevel，配置变更时整体清空
+        # 免去高频 check_permission 每次的嵌套 get + 枚举构造
+        self._perm_cache: Dict[str, PermissionLevel] = {}
         self._ensure_default_config()
     
     def _ensure_default_config(self):
@@ -57,34 +74,82 @@ class MCPConfigManager:
             }
     
     def _load_config(self) -> Dict:
-        """加载配置"""
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                pass
-        return {}
+        """加载配置（文件未变时直接复用缓存的解析结果）"""
+        try:
+            st = os.stat(CONFIG_FILE)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return {}
+
+        if _CONFIG_CACHE["stat"] == stat_key:
+            return _CONFIG_CACHE["config"]
+
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except:
+            return {}
+
+        _CONFIG_CACHE["stat"] = stat_key
+        _CONFIG_CACHE["config"] = config
+        return config
     
     def save_config(self):
         """保存配置"""
-        # 自动备份
-        if self.config.get("settings", {}).get("auto_backup", True):
+        # 配置未变更则不做任何 I/O
+        if not self._dirty:
+            return
+
+        # 自动备份：按 backup_interval_hours 节流，
+        # 不再每次保存都读旧文件做一份备份
+        settings = self.config.get("settings", {})
+        if settings.get("auto_backup", True) and self._backup_due(settings):
             self.backup_config()
-        
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+
+        # 写临时文件后原子替换：崩溃不丢旧配置，
+        # 也保证硬链接出去的备份不会被原地截断破坏
+        tmp_file = CONFIG_FILE + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(self.config, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CONFIG_FILE)
+        self._dirty = False
+
+    def _backup_due(self, settings: Dict) -> bool:
+        """距上次备份是否已超过配置的间隔"""
+        interval_hours = settings.get("backup_interval_hours", 24)
+        newest = 0.0
+        try:
+            with os.scandir(BACKUP_DIR) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        mtime = entry.stat().st_mtime
+                        if mtime > newest:
+                            newest = mtime
+        except OSError:
+            return True
+        if newest == 0.0:
+            return True
+        return (datetime.now().timestamp() - newest) >= interval_hours * 3600
     
     def backup_config(self) -> str:
         """备份配置"""
+        # 配置文件尚不存在时无可备份（原实现会把 "" 传给 copy2 直接抛错）
+        if not os.path.exists(CONFIG_FILE):
+            return ""
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(BACKUP_DIR, f"mcp_config_{timestamp}.json")
-        
-        shutil.copy2(CONFIG_FILE if os.path.exists(CONFIG_FILE) else "", backup_file)
-        
+
+        # 备份目录与配置同文件系统，硬链接零拷贝；
+        # 跨文件系统或文件系统不支持时退回逐字节复制
+        try:
+            os.link(CONFIG_FILE, backup_file)
+        except OSError:
+            shutil.copy2(CONFIG_FILE, backup_file)
+
         # 清理旧备份
         self._cleanup_old_backups()
-        
+
         return backup_file
     
     def _cleanup_old_backups(self):
@@ -102,6 +167,8 @@ class MCPConfigManager:
             if os.path.exists(backup_file):
                 shutil.copy2(backup_file, CONFIG_FILE)
                 self.config = self._load_config()
+                self._perm_cache.clear()
+                self._dirty = False
                 return True
         except:
             pass
@@ -109,32 +176,44 @@ class MCPConfigManager:
     
     def list_backups(self) -> List[Dict]:
         """列出所有备份"""
-        backups = []
-        for f in os.listdir(BACKUP_DIR):
-            if f.endswith(".json"):
-                file_path = os.path.join(BACKUP_DIR, f)
-                mtime = os.path.getmtime(file_path)
-                backups.append({
-                    "file": f,
-                    "path": file_path,
-                    "timestamp": datetime.fromtimestamp(mtime).isoformat(),
-                    "size": os.path.getsize(file_path)
-                })
-        
-        backups.sort(key=lambda x: x["timestamp"], reverse=True)
-        return backups
+        # scandir 的 dirent.stat() 一次取回 mtime+size，
+        # 替代每个文件 getmtime+getsize 各一次 stat
+        entries = []
+        with os.scandir(BACKUP_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name, entry.path, st.st_size))
+
+        # 按数值 mtime 排序，ISO 时间串只在输出时生成
+        entries.sort(reverse=True)
+        return [
+            {
+                "file": name,
+                "path": path,
+                "timestamp": datetime.fromtimestamp(mtime).isoformat(),
+                "size": size
+            }
+            for mtime, name, path, size in entries
+        ]
     
     def set_agent_permission(self, agent_name: str, permission: PermissionLevel):
         """设置智能体权限"""
         if "permissions" not in self.config:
             self.config["permissions"] = {}
         self.config["permissions"][agent_name] = permission.value
+        self._perm_cache.clear()
+        self._dirty = True
         self.save_config()
     
     def get_agent_permission(self, agent_name: str) -> PermissionLevel:
         """获取智能体权限"""
-        permission_str = self.config.get("permissions", {}).get(agent_name, PermissionLevel.NORMAL.value)
-        return PermissionLevel(permission_str)
+        permission = self._perm_cache.get(agent_name)
+        if permission is None:
+            permission_str = self.config.get("permissions", {}).get(agent_name, PermissionLevel.NORMAL.value)
+            permission = PermissionLevel(permission_str)
+            self._perm_cache[agent_name] = permission
+        return permission
     
     def check_permission(self, agent_name: str, action: str) -> bool:
         """
@@ -147,22 +226,14 @@ class MCPConfigManager:
         Returns:
             是否有权限
         """
-        permission = self.get_agent_permission(agent_name)
-        
-        if permission == PermissionLevel.ADMIN:
-            return True
-        elif permission == PermissionLevel.NORMAL:
-            return action in ["read", "write"]
-        elif permission == PermissionLevel.READONLY:
-            return action == "read"
-        else:  # GUEST
-            return False
+        return action in _PERMISSION_ACTIONS[self.get_agent_permission(agent_name)]
     
     def update_agent_config(self, agent_name: str, config: Dict):
         """更新智能体配置"""
         if "agents" not in self.config:
             self.config["agents"] = {}
         self.config["agents"][agent_name] = config
+        self._dirty = True
         self.save_config()
     
     def get_agent_config(self, agent_name: str) -> Dict:
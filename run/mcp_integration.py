@@ -12,33 +12,65 @@ MCP 联调模块 - System-2 推理与 MCP 协议对接
 日期：2024-12
 """
 
+import atexit
+import functools
 import json
+import logging
+import queue
+import re
+import threading
 import time
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple, Any
 
-# 尝试导入 D-Bus（Linux 专用）
+# 尝试导入 orjson 加速 D-Bus 载荷的 JSON 编解码（缺失则退回标准库）
 try:
-    import dbus
-    HAS_DBUS = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_DBUS = False
+    HAS_ORJSON = False
+
+if HAS_ORJSON:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+# 检测 D-Bus 是否可用（Linux 专用）
+# find_spec 只查找不导入：模拟模式/测试启动时不付 D-Bus 栈的导入成本，
+# 真正的 import dbus 推迟到 connect() 首次调用
+import importlib.util
+
+HAS_DBUS = importlib.util.find_spec("dbus") is not None
+if not HAS_DBUS:
     print("警告: dbus-python 未安装，MCP 功能将使用模拟模式")
     print("安装命令: pip install dbus-python")
 
-# 导入推理模块
-from system2_memory import (
-    reasoning_with_memory,
-    get_reasoning_for_master,
-    validate_for_mcp,
-    normalize_for_mcp
-)
+dbus = None  # 延迟导入占位
+
+
+def _load_dbus():
+    """首次连接时才导入 dbus"""
+    global dbus
+    if dbus is None:
+        import dbus
+
+
+# 推理/记忆模块同样延迟导入：纯 MCP 客户端（尤其模拟模式）用不到，
+# 导入链会拉起整个推理栈
+def _lazy_reasoning_with_memory(*args, **kwargs):
+    from system2_memory import reasoning_with_memory
+    return reasoning_with_memory(*args, **kwargs)
 
-# 导入记忆模块
-from memory_store import (
-    save_collaboration_trajectory,
-    STORAGE_DIR
-)
+
+def _lazy_save_trajectory(*args, **kwargs):
+    from memory_store import save_collaboration_trajectory
+    return save_collaboration_trajectory(*args, **kwargs)
 
 
 # ============================================================
@@ -54,11 +86,52 @@ MCP_INTERFACE_NAME = "com.kylin.ai.mcp.MasterAgent"
 # MCP 连接管理
 # ============================================================
 
+# ============================================================
+# 模拟工具结果处理器（查表分发，避免每次调用走 if/elif 串比较）
+# ============================================================
+
+class _SafeDict(dict):
+    """format_map 用的缺省字典：缺参渲染为 None，与 parameters.get() 一致"""
+
+    def __missing__(self, key):
+        return None
+
+
+def _mock_search_file(parameters: Dict) -> Dict:
+    return {
+        "success": True,
+        "result": {
+            "files": ["~/Downloads/image1.png", "~/Downloads/image2.png"],
+            "count": 2
+        }
+    }
+
+
 class MCPClient:
     """
     MCP 客户端 - 封装与 MCP Server 的 D-Bus 通信
     """
-    
+
+    # 固定属性集：省去每实例 __dict__，属性访问走 C 层槽位
+    __slots__ = (
+        "bus_type", "bus", "proxy", "interface", "connected",
+        "_mock_mode", "_mock_tools", "_mock_agents",
+        "_mock_tool_names", "_mock_agent_names",
+        "_tools_cache", "_agents_cache", "_identity",
+    )
+
+    # 工具名 -> 结果消息模板（仅需填参的工具；初始化一次，调用时 format_map）
+    _MOCK_TEMPLATES = {
+        "move_to_trash": "文件 {file_path} 已移动到回收站",
+        "change_wallpaper": "壁纸已更换为 {image_path}",
+        "adjust_volume": "音量已调整到 {level}%",
+    }
+
+    # 工具名 -> 模拟结果处理器（返回结构化结果的工具）
+    _MOCK_DISPATCH = {
+        "search_file": _mock_search_file,
+    }
+
     def __init__(self, bus_type: str = "session"):
         """
         初始化 MCP 客户端
@@ -125,7 +198,18 @@ class MCPClient:
                 "is_alive": True
             }
         ]
-    
+
+        # 名称集合：工具存在性判断 O(1)，注册时校验重名
+        self._mock_tool_names = frozenset(t["name"] for t in self._mock_tools)
+        self._mock_agent_names = {a["name"] for a in self._mock_agents}
+
+        # 工具/智能体列表的 TTL 缓存（(单调时钟时间, 结果)，注册变更时失效）
+        self._tools_cache = None
+        self._agents_cache = None
+
+        # 身份信息缓存（连接期间不变的四个静态串，首次访问一次性取回）
+        self._identity = None
+
     def connect(self) -> bool:
         """
         连接到 MCP Server
@@ -139,6 +223,8 @@ class MCPClient:
             return True
         
         try:
+            _load_dbus()
+
             # 根据总线类型创建连接
             if self.bus_type == "session":
                 self.bus = dbus.SessionBus()
@@ -162,47 +248,76 @@ class MCPClient:
             print(f"✗ 连接 MCP Server 失败: {e}")
             return False
     
+    def invalidate_cache(self):
+        """手动作废工具/智能体列表缓存（服务端变更后调用）"""
+        self._tools_cache = None
+        self._agents_cache = None
+
+    def __enter__(self) -> "MCPClient":
+        """上下文管理：进入时确保连接"""
+        if not self.connected:
+            self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理：退出时断开"""
+        self.disconnect()
+        return False
+
     def disconnect(self):
         """断开连接"""
         self.bus = None
         self.proxy = None
         self.interface = None
         self.connected = False
+        self._identity = None
         print("已断开 MCP Server 连接")
     
     # ========== 基础信息接口 ==========
-    
+
+    def _fetch_identity(self) -> Dict:
+        """
+        一次性取回四个静态身份串并缓存
+
+        这四个值在连接期间不变，缓存后各 getter 退化为字典查找，
+        四次 D-Bus 往返只发生一次。
+        """
+        if self._identity is None:
+            self._identity = {
+                "dbus_type": _json_loads(self.interface.DBusType()),
+                "service_name": _json_loads(self.interface.ServiceName()),
+                "object_path": _json_loads(self.interface.ObjectPath()),
+                "interface_name": _json_loads(self.interface.InterfaceName()),
+            }
+        return self._identity
+
     def get_dbus_type(self) -> Dict:
         """获取 D-Bus 总线类型"""
         if self._mock_mode:
             return {"type": self.bus_type}
-        
-        result = self.interface.DBusType()
-        return json.loads(result)
-    
+
+        return self._fetch_identity()["dbus_type"]
+
     def get_service_name(self) -> Dict:
         """获取服务名称"""
         if self._mock_mode:
             return {"name": MCP_SERVICE_NAME}
-        
-        result = self.interface.ServiceName()
-        return json.loads(result)
-    
+
+        return self._fetch_identity()["service_name"]
+
     def get_object_path(self) -> Dict:
         """获取对象路径"""
         if self._mock_mode:
             return {"path": MCP_OBJECT_PATH}
-        
-        result = self.interface.ObjectPath()
-        return json.loads(result)
-    
+
+        return self._fetch_identity()["object_path"]
+
     def get_interface_name(self) -> Dict:
         """获取接口名称"""
         if self._mock_mode:
             return {"name": MCP_INTERFACE_NAME}
-        
-        result = self.interface.InterfaceName()
-        return json.loads(result)
+
+        return self._fetch_identity()["interface_name"]
     
     # ========== 健康检查接口 ==========
     
@@ -218,7 +333,7 @@ class MCPClient:
         
         try:
             result = self.interface.Ping()
-            data = json.loads(result)
+            data = _json_loads(result)
             return data.get("status") == "ok"
         except Exception as e:
             print(f"Ping 失败: {e}")
@@ -242,7 +357,7 @@ class MCPClient:
         
         try:
             result = self.interface.ToolsList()
-            return json.loads(result)
+            return _json_loads(result)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -257,7 +372,7 @@ class MCPClient:
         Returns:
             调用结果字典
         """
-        parameters_json = json.dumps(parameters)
+        parameters_json = _json_dumps(parameters)
         
         if self._mock_mode:
             # 模拟工具调用结果
@@ -265,43 +380,29 @@ class MCPClient:
         
         try:
             result = self.interface.ToolsCall(tool_name, parameters_json)
-            return json.loads(result)
+            return _json_loads(result)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
     def _mock_tool_call(self, tool_name: str, parameters: Dict) -> Dict:
         """模拟工具调用"""
         # 检查工具是否存在
-        tool_names = [t["name"] for t in self._mock_tools]
-        if tool_name not in tool_names:
+        if tool_name not in self._mock_tool_names:
             return {"success": False, "error": f"工具 '{tool_name}' 不存在"}
-        
-        # 模拟不同工具的返回结果
-        if tool_name == "search_file":
-            return {
-                "success": True,
-                "result": {
-                    "files": ["~/Downloads/image1.png", "~/Downloads/image2.png"],
-                    "count": 2
-                }
-            }
-        elif tool_name == "move_to_trash":
-            return {
-                "success": True,
-                "result": {"message": f"文件 {parameters.get('file_path')} 已移动到回收站"}
-            }
-        elif tool_name == "change_wallpaper":
-            return {
-                "success": True,
-                "result": {"message": f"壁纸已更换为 {parameters.get('image_path')}"}
-            }
-        elif tool_name == "adjust_volume":
+
+        # 消息模板优先：format_map 一次填参，免去逐字段 .get() 调用
+        template = self._MOCK_TEMPLATES.get(tool_name)
+        if template is not None:
             return {
                 "success": True,
-                "result": {"message": f"音量已调整到 {parameters.get('level')}%"}
+                "result": {"message": template.format_map(_SafeDict(parameters))}
             }
-        else:
-            return {"success": True, "result": {"message": "操作完成"}}
+
+        # 结构化结果查表分发；已注册但无专属处理器的工具返回通用结果
+        handler = self._MOCK_DISPATCH.get(tool_name)
+        if handler is not None:
+            return handler(parameters)
+        return {"success": True, "result": {"message": "操作完成"}}
     
     # ========== 子智能体管理接口 ==========
     
@@ -321,7 +422,7 @@ class MCPClient:
         
         try:
             result = self.interface.AgentsList()
-            return json.loads(result)
+            return _json_loads(result)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -335,9 +436,16 @@ class MCPClient:
         Returns:
             注册结果字典
         """
-        agent_info_json = json.dumps(agent_info)
-        
+        agent_info_json = _json_dumps(agent_info)
+
+        # 注册改变工具/智能体视图，列表缓存作废
+        self._tools_cache = None
+        self._agents_cache = None
+
         if self._mock_mode:
+            if agent_info["name"] in self._mock_agent_names:
+                return {"success": False, "error": f"Agent '{agent_info['name']}' already registered"}
+            self._mock_agent_names.add(agent_info["name"])
             self._mock_agents.append({
                 "name": agent_info["name"],
                 "service": agent_info["service"],
@@ -351,7 +459,7 @@ class MCPClient:
         
         try:
             result = self.interface.AgentRegister(agent_info_json)
-            return json.loads(result)
+            return _json_loads(result)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -365,13 +473,17 @@ class MCPClient:
         Returns:
             注销结果字典
         """
+        self._tools_cache = None
+        self._agents_cache = None
+
         if self._mock_mode:
             self._mock_agents = [a for a in self._mock_agents if a["name"] != agent_name]
+            self._mock_agent_names.discard(agent_name)
             return {"success": True, "message": f"Agent '{agent_name}' unregistered successfully"}
         
         try:
             result = self.interface.AgentUnregister(agent_name)
-            return json.loads(result)
+            return _json_loads(result)
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -380,22 +492,31 @@ class MCPClient:
 # 推理链与 MCP 适配
 # ============================================================
 
+# 工具/智能体列表缓存有效期（秒）
+# 一次推理会话内这两个列表几乎不变，缓存把重复的 D-Bus 往返折叠成一次
+MCP_LIST_CACHE_TTL = 5.0
+
+
 def get_available_tools(mcp_client: MCPClient) -> Dict[str, Dict]:
     """
-    获取 MCP 可用工具映射
-    
+    获取 MCP 可用工具映射（带 TTL 缓存）
+
     Args:
         mcp_client: MCP 客户端
-        
+
     Returns:
         {tool_name: {parameters, agent, description}}
     """
+    cached = mcp_client._tools_cache
+    if cached is not None and time.monotonic() - cached[0] < MCP_LIST_CACHE_TTL:
+        return cached[1]
+
     tools_result = mcp_client.tools_list()
-    
+
     if not tools_result.get("success"):
         print(f"⚠️ 获取工具列表失败: {tools_result.get('error')}")
         return {}
-    
+
     tool_map = {}
     for tool in tools_result.get("tools", []):
         tool_map[tool["name"]] = {
@@ -403,57 +524,78 @@ def get_available_tools(mcp_client: MCPClient) -> Dict[str, Dict]:
             "agent": tool.get("agent", ""),
             "description": tool.get("description", "")
         }
-    
+
+    # 只缓存成功结果，失败下次重试
+    mcp_client._tools_cache = (time.monotonic(), tool_map)
     return tool_map
 
 
 def get_available_agents(mcp_client: MCPClient) -> List[Dict]:
     """
-    获取可用子智能体列表
-    
+    获取可用子智能体列表（带 TTL 缓存）
+
     Args:
         mcp_client: MCP 客户端
-        
+
     Returns:
         在线的子智能体列表
     """
+    cached = mcp_client._agents_cache
+    if cached is not None and time.monotonic() - cached[0] < MCP_LIST_CACHE_TTL:
+        return cached[1]
+
     agents_result = mcp_client.agents_list()
-    
+
     if not agents_result.get("success"):
         print(f"⚠️ 获取子智能体列表失败: {agents_result.get('error')}")
         return []
-    
+
     # 只返回在线的子智能体
     online_agents = [
         agent for agent in agents_result.get("agents", [])
         if agent.get("is_alive", False)
     ]
-    
+
+    mcp_client._agents_cache = (time.monotonic(), online_agents)
     return online_agents
 
 
+# build_mcp_aware_prompt 的派生数据缓存：
+# get_available_tools 在 TTL 内返回同一个 tool_map 对象，
+# 按对象身份记住序列化结果即可避免每次 json.dumps 全量遍历
+_PROMPT_RESOURCE_CACHE = {"tool_map": None, "json": None, "agent_names": None}
+
+
 def build_mcp_aware_prompt(user_task: str, tool_map: Dict, agents: List[Dict]) -> str:
     """
     构建 MCP 感知的推理 Prompt
-    
+
     Args:
         user_task: 用户任务
         tool_map: 可用工具映射
         agents: 可用子智能体列表
-        
+
     Returns:
         增强后的 Prompt
     """
-    agent_names = list(set(t["agent"] for t in tool_map.values() if t["agent"]))
-    tool_names = list(tool_map.keys())
-    
+    cache = _PROMPT_RESOURCE_CACHE
+    if cache["tool_map"] is tool_map:
+        agent_names = cache["agent_names"]
+        tool_map_json = cache["json"]
+    else:
+        agent_names = sorted({t["agent"] for t in tool_map.values() if t["agent"]})
+        tool_map_json = json.dumps(tool_map, indent=2, ensure_ascii=False)
+        cache["tool_map"] = tool_map
+        cache["agent_names"] = agent_names
+        cache["json"] = tool_map_json
+
     mcp_context = f"""
 ## MCP 可用资源（必须遵守）
 ### 可用子智能体
 {', '.join(agent_names) if agent_names else '无'}
 
 ### 可用工具
-{json.dumps(tool_map, indent=2, ensure_ascii=False)}
+{tool_map_json}
 
 ### 重要约束
 - agent_selection 中的 agent 必须从可用子智能体中选择
@@ -468,6 +610,21 @@ def build_mcp_aware_prompt(user_task: str, tool_map: Dict, agents: List[Dict]) -
 # MCP 集成推理流程
 # ============================================================
 
+# 推理流程日志：懒格式化（%-占位参数在级别关闭时不求值），
+# verbose=False 时级别抬到 WARNING，零格式化开销
+_log = logging.getLogger("mcp")
+
+
+def _configure_mcp_logging(verbose: bool):
+    """按 verbose 配置 mcp 日志器（处理器只挂一次）"""
+    if not _log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _log.addHandler(handler)
+        _log.propagate = False
+    _log.setLevel(logging.INFO if verbose else logging.WARNING)
+
+
 def reasoning_with_mcp(
     user_task: str,
     mcp_client: MCPClient,
@@ -491,42 +648,34 @@ def reasoning_with_mcp(
     Returns:
         (推理链, 执行结果列表)
     """
-    if verbose:
-        print("\n" + "=" * 70)
-        print("MCP 集成推理流程")
-        print("=" * 70)
-        print(f"用户任务: {user_task}")
-    
+    _configure_mcp_logging(verbose)
+    _log.info("\n%s\nMCP 集成推理流程\n%s\n用户任务: %s", "=" * 70, "=" * 70, user_task)
+
     # Step 1: 检查 MCP Server 状态
-    if verbose:
-        print("\n--- Step 1: MCP 健康检查 ---")
-    
+    _log.info("\n--- Step 1: MCP 健康检查 ---")
+
     if not mcp_client.connected:
         if not mcp_client.connect():
             return {"error": "MCP Server 未连接"}, []
-    
+
     if not mcp_client.ping():
         return {"error": "MCP Server 健康检查失败"}, []
-    
-    if verbose:
-        print("✓ MCP Server 运行正常")
-    
+
+    _log.info("✓ MCP Server 运行正常")
+
     # Step 2: 获取可用工具和子智能体
-    if verbose:
-        print("\n--- Step 2: 获取 MCP 资源 ---")
-    
+    _log.info("\n--- Step 2: 获取 MCP 资源 ---")
+
     tool_map = get_available_tools(mcp_client)
     agents = get_available_agents(mcp_client)
-    
-    if verbose:
-        print(f"可用工具: {list(tool_map.keys())}")
-        print(f"在线子智能体: {[a['name'] for a in agents]}")
-    
+
+    _log.info("可用工具: %s", list(tool_map))
+    _log.info("在线子智能体: %s", [a['name'] for a in agents])
+
     # Step 3: 生成推理链
-    if verbose:
-        print("\n--- Step 3: 生成推理链 ---")
-    
-    reasoning_chain, trajectory_path = reasoning_with_memory(
+    _log.info("\n--- Step 3: 生成推理链 ---")
+
+    reasoning_chain, trajectory_path = _lazy_reasoning_with_memory(
         user_task=user_task,
         screenshot_path=screenshot_path,
         enable_reuse=True,
@@ -534,9 +683,8 @@ def reasoning_with_mcp(
     )
     
     # Step 4: 解析推理链并执行 MCP 调用
-    if verbose:
-        print("\n--- Step 4: 执行 MCP 工具调用 ---")
-    
+    _log.info("\n--- Step 4: 执行 MCP 工具调用 ---")
+
     execution_results = execute_reasoning_via_mcp(
         reasoning_chain=reasoning_chain,
         mcp_client=mcp_client,
@@ -545,24 +693,36 @@ def reasoning_with_mcp(
     )
     
     # Step 5: 更新轨迹存储（添加 MCP 执行结果）
-    if verbose:
-        print("\n--- Step 5: 存储协作轨迹 ---")
-    
-    # 汇总执行结果
-    success = all(r.get("success", False) for r in execution_results) if execution_results else True
-    execution_summary = json.dumps(execution_results, ensure_ascii=False)
-    
+    _log.info("\n--- Step 5: 存储协作轨迹 ---")
+
+    # 汇总执行结果：单次遍历同时得到成败、工具名与错误列表，
+    # 序列化一次，落盘时直接复用该串
+    success = True
+    mcp_tools_called: List[str] = []
+    mcp_errors: List[str] = []
+    for r in execution_results:
+        success = success and r.get("success", False)
+        tool_name = r.get("tool_name")
+        if tool_name:
+            mcp_tools_called.append(tool_name)
+        error = r.get("error")
+        if error:
+            mcp_errors.append(error)
+    execution_summary = _json_dumps(execution_results)
+
     # 保存包含 MCP 信息的轨迹
     save_mcp_trajectory(
         task=user_task,
         reasoning_chain=reasoning_chain,
         mcp_results=execution_results,
-        success=success
+        success=success,
+        execution_summary=execution_summary,
+        mcp_tools_called=mcp_tools_called,
+        mcp_errors=mcp_errors
     )
     
-    if verbose:
-        print(f"✓ 协作轨迹已保存")
-    
+    _log.info("✓ 协作轨迹已提交后台保存")
+
     return reasoning_chain, execution_results
 
 
@@ -584,154 +744,377 @@ def execute_reasoning_via_mcp(
     Returns:
         执行结果列表
     """
-    results = []
-    
     # 获取执行计划
     execution_plan = reasoning_chain.get("execution_plan", [])
-    
+
+    _configure_mcp_logging(verbose)
+
     if not execution_plan:
-        if verbose:
-            print("⚠️ 推理链无执行计划")
-        return results
-    
+        _log.warning("⚠️ 推理链无执行计划")
+        return []
+
+    # 预解析所有步骤的工具调用
+    parsed = []
     for i, step in enumerate(execution_plan, 1):
         action = step.get("action", "")
         agent = step.get("agent", "")
-        
-        if verbose:
-            print(f"\n  Step {i}: {action[:50]}... (Agent: {agent})")
-        
-        # 解析工具调用
-        tool_call = parse_tool_call_from_action(action, tool_map)
-        
-        if tool_call:
-            tool_name = tool_call["tool_name"]
-            parameters = tool_call["parameters"]
-            
-            if verbose:
-                print(f"    → 调用工具: {tool_name}")
-                print(f"    → 参数: {parameters}")
-            
-            # 执行 MCP 工具调用
-            result = mcp_client.tools_call(tool_name, parameters)
-            
-            result["step"] = i
-            result["tool_name"] = tool_name
-            result["parameters"] = parameters
-            results.append(result)
-            
-            if verbose:
+        parsed.append((i, action, agent, parse_tool_call_from_action(action, tool_map)))
+
+    # 按序号回填结果，波内并发不打乱返回顺序
+    results_by_step = {}
+    for wave in _plan_waves(parsed):
+        _execute_wave(wave, mcp_client, tool_map, results_by_step)
+
+    results = [results_by_step[i] for i, _, _, _ in parsed]
+
+    # 每步的多行详情拼成单条日志发出；级别关闭时整块跳过，不做任何格式化
+    if _log.isEnabledFor(logging.INFO):
+        for (i, action, agent, tool_call), result in zip(parsed, results):
+            lines = [f"\n  Step {i}: {action[:50]}... (Agent: {agent})"]
+            if tool_call:
+                lines.append(f"    → 调用工具: {tool_call['tool_name']}")
+                lines.append(f"    → 参数: {tool_call['parameters']}")
                 status = "✓" if result.get("success") else "✗"
-                print(f"    → 结果: {status} {result.get('result', result.get('error', ''))}"[:60])
-        else:
-            if verbose:
-                print(f"    → 无法解析工具调用，跳过")
-            results.append({
+                lines.append(f"    → 结果: {status} {result.get('result', result.get('error', ''))}"[:60])
+            else:
+                lines.append("    → 无法解析工具调用，跳过")
+            _log.info("%s", "\n".join(lines))
+
+    return results
+
+
+def _plan_waves(parsed: List[Tuple]) -> List[List[Tuple]]:
+    """
+    把执行步骤分成可并行的"波"
+
+    同一波内各步骤归属不同子智能体（无共享状态，可并发下发）；
+    当某步骤的智能体已在当前波出现，视为存在先后依赖，开启新的一波。
+    无法解析为工具调用的步骤不占资源，可并入任意波。
+    """
+    waves = []
+    current, used_agents = [], set()
+    for item in parsed:
+        _, _, agent, tool_call = item
+        if tool_call is not None and agent and agent in used_agents:
+            waves.append(current)
+            current, used_agents = [], set()
+        current.append(item)
+        if tool_call is not None and agent:
+            used_agents.add(agent)
+    if current:
+        waves.append(current)
+    return waves
+
+
+def _execute_wave(
+    wave: List[Tuple],
+    mcp_client: MCPClient,
+    tool_map: Dict,
+    results_by_step: Dict[int, Dict]
+):
+    """执行一波步骤，结果按步骤序号写入 results_by_step"""
+    # 不含工具调用的步骤直接记录
+    calls = []
+    for i, action, agent, tool_call in wave:
+        if tool_call is None:
+            results_by_step[i] = {
                 "step": i,
                 "success": True,
                 "result": {"message": "步骤已记录，无需工具调用"}
-            })
-    
-    return results
+            }
+        else:
+            calls.append((i, tool_call))
+
+    if not calls:
+        return
+
+    def _one_call(item):
+        i, tool_call = item
+        result = mcp_client.tools_call(tool_call["tool_name"], tool_call["parameters"])
+        result["step"] = i
+        result["tool_name"] = tool_call["tool_name"]
+        result["parameters"] = tool_call["parameters"]
+        return i, result
+
+    if len(calls) == 1:
+        i, result = _one_call(calls[0])
+        results_by_step[i] = result
+        return
+
+    # 服务端支持 batch_execute 时把整波折叠成一次往返
+    if "batch_execute" in tool_map:
+        batch_result = mcp_client.tools_call("batch_execute", {
+            "operations": [
+                {"tool_name": tc["tool_name"], "parameters": tc["parameters"]}
+                for _, tc in calls
+            ],
+            "maxConcurrent": 8,
+            "stopOnError": False
+        })
+        sub_results = batch_result.get("results")
+        if isinstance(sub_results, list) and len(sub_results) == len(calls):
+            for (i, tool_call), result in zip(calls, sub_results):
+                result["step"] = i
+                result["tool_name"] = tool_call["tool_name"]
+                result["parameters"] = tool_call["parameters"]
+                results_by_step[i] = result
+            return
+        # 批量接口返回异常则退回逐个并发调用
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(8, len(calls))) as executor:
+        for i, result in executor.map(_one_call, calls):
+            results_by_step[i] = result
+
+
+# 动作解析的字面量正则（模块级预编译，解析热路径不再反复进 re 缓存）
+_PATH_RE = re.compile(r'[~/\w]+/[\w.*]+')
+_GLOB_RE = re.compile(r'\*\.\w+')
+_NUM_RE = re.compile(r'\b(\d+)\s*%?')
+
+
+@functools.lru_cache(maxsize=16)
+def _tool_name_regex(tool_names: frozenset):
+    """
+    把工具名集合编译成单个选择分支正则（按名字集合缓存）
+
+    一次扫描替代逐工具 `name in action` 的 N 遍子串搜索；
+    长名在前，重叠时长名优先命中。
+
+    边界用 ASCII 环视而非 \\b：中文在 \\w 内，action 里工具名
+    常直接贴着中文（如 "调用search_file工具"），\\b 会漏配。
+    """
+    return re.compile(
+        r'(?<![A-Za-z0-9_])(?:' + "|".join(
+            re.escape(t) for t in sorted(tool_names, key=len, reverse=True)
+        ) + r')(?![A-Za-z0-9_])',
+        re.IGNORECASE
+    )
+
+
+@functools.lru_cache(maxsize=512)
+def _param_patterns(param_name: str) -> Tuple:
+    """按参数名缓存两个取值正则（引号/无引号两种写法）"""
+    return (
+        re.compile(rf"{param_name}\s*[=:]\s*['\"]?([^'\"，,;]+)['\"]?", re.IGNORECASE),
+        re.compile(rf"{param_name}\s*[=:]\s*(\S+)", re.IGNORECASE),
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _combined_param_regex(param_names: Tuple[str, ...]):
+    """
+    把一个工具的全部参数取值模式合并成单个正则（按参数名元组缓存）
+
+    一次 finditer 扫描替代每参数两遍 re.search；
+    哪个 *_v 命名组非空就是哪个参数命中。
+    """
+    return re.compile(
+        "|".join(
+            rf"{name}\s*[=:]\s*['\"]?(?P<{name}__v>[^'\"，,;]+)['\"]?"
+            for name in param_names
+        ),
+        re.IGNORECASE
+    )
 
 
 def parse_tool_call_from_action(action: str, tool_map: Dict) -> Optional[Dict]:
     """
     从 action 描述中解析工具调用
-    
+
     Args:
         action: 动作描述
         tool_map: 可用工具映射
-        
+
     Returns:
         {"tool_name": str, "parameters": dict} 或 None
     """
-    import re
-    
-    # 检查是否包含已知工具名
-    for tool_name, tool_info in tool_map.items():
-        if tool_name in action.lower():
-            # 尝试提取参数
-            parameters = {}
-            param_defs = tool_info.get("parameters", {})
-            
-            for param_name in param_defs.keys():
-                # 尝试多种模式匹配参数值
-                patterns = [
-                    rf"{param_name}\s*[=:]\s*['\"]?([^'\"，,;]+)['\"]?",
-                    rf"{param_name}\s*[=:]\s*(\S+)",
-                ]
-                for pattern in patterns:
-                    match = re.search(pattern, action, re.IGNORECASE)
-                    if match:
-                        parameters[param_name] = match.group(1).strip()
-                        break
-            
-            # 如果没有解析到参数，使用默认值
-            if not parameters:
-                # 从 action 中提取路径等信息
-                path_match = re.search(r'[~/\w]+/[\w.*]+', action)
-                if path_match:
-                    # 根据工具类型设置默认参数
-                    if "dir" in param_defs:
-                        parameters["dir"] = path_match.group(0)
-                    elif "file_path" in param_defs:
-                        parameters["file_path"] = path_match.group(0)
-                    elif "image_path" in param_defs:
-                        parameters["image_path"] = path_match.group(0)
-                
-                # 提取文件模式
-                pattern_match = re.search(r'\*\.\w+', action)
-                if pattern_match and "pattern" in param_defs:
-                    parameters["pattern"] = pattern_match.group(0)
-                
-                # 提取数字（如音量级别）
-                num_match = re.search(r'\b(\d+)\s*%?', action)
-                if num_match and "level" in param_defs:
-                    parameters["level"] = int(num_match.group(1))
-            
-            return {"tool_name": tool_name, "parameters": parameters}
-    
-    return None
+    if not tool_map:
+        return None
+
+    # 单遍扫描定位工具名（替代逐工具子串搜索）
+    match = _tool_name_regex(frozenset(tool_map)).search(action)
+    if match is None:
+        return None
+
+    tool_name = match.group(0)
+    tool_info = tool_map.get(tool_name)
+    if tool_info is None:
+        # IGNORECASE 命中时回到小写键
+        tool_name = tool_name.lower()
+        tool_info = tool_map.get(tool_name)
+        if tool_info is None:
+            return None
+
+    # 尝试提取参数
+    parameters = {}
+    param_defs = tool_info.get("parameters", {})
+    param_names = tuple(param_defs.keys())
+
+    if param_names:
+        combined = _combined_param_regex(param_names)
+
+        def _scan(text: str):
+            # 合并正则单遍扫描，取各参数的首次命中
+            for param_match in combined.finditer(text):
+                for key, value in param_match.groupdict().items():
+                    if value is not None:
+                        name = key[:-3]  # 去掉 "__v" 后缀
+                        if name not in parameters:
+                            parameters[name] = value.strip()
+
+        # 参数几乎总是紧跟工具名出现：先只扫工具名之后的 256 字符窗口
+        window_end = match.end() + 256
+        _scan(action[match.end():window_end])
+
+        # 窗口一无所获且窗口未覆盖全文时，退回整串扫描
+        if not parameters and (match.start() > 0 or window_end < len(action)):
+            _scan(action)
+
+        # 仍未命中的参数用宽松模式（无引号任意非空白）在全文补扫
+        for param_name in param_names:
+            if param_name not in parameters:
+                param_match = _param_patterns(param_name)[1].search(action)
+                if param_match:
+                    parameters[param_name] = param_match.group(1).strip()
+
+    # 如果没有解析到参数，使用默认值
+    if not parameters:
+        # 从 action 中提取路径等信息
+        path_match = _PATH_RE.search(action)
+        if path_match:
+            # 根据工具类型设置默认参数
+            if "dir" in param_defs:
+                parameters["dir"] = path_match.group(0)
+            elif "file_path" in param_defs:
+                parameters["file_path"] = path_match.group(0)
+            elif "image_path" in param_defs:
+                parameters["image_path"] = path_match.group(0)
+
+        # 提取文件模式
+        pattern_match = _GLOB_RE.search(action)
+        if pattern_match and "pattern" in param_defs:
+            parameters["pattern"] = pattern_match.group(0)
+
+        # 提取数字（如音量级别）
+        num_match = _NUM_RE.search(action)
+        if num_match and "level" in param_defs:
+            parameters["level"] = int(num_match.group(1))
+
+    return {"tool_name": tool_name, "parameters": parameters}
 
 
 # ============================================================
 # MCP 轨迹存储
 # ============================================================
 
+# 轨迹落盘走后台写线程：推理主流程把保存任务入队后立即返回，
+# 序列化 + 文件 I/O 与下一次 MCP 调用重叠
+_SAVE_QUEUE: "queue.Queue" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def _drain_save_queue():
+    """后台写线程主循环：逐个执行入队的保存任务"""
+    while True:
+        job = _SAVE_QUEUE.get()
+        try:
+            job()
+        except Exception as e:
+            print(f"⚠️ 轨迹异步保存失败: {e}")
+        finally:
+            _SAVE_QUEUE.task_done()
+
+
+def _ensure_writer_thread():
+    """按需启动后台写线程（守护线程，进程退出前由 flush 清空队列）"""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(
+                target=_drain_save_queue,
+                name="mcp-trajectory-writer",
+                daemon=True
+            )
+            _writer_thread.start()
+
+
+def flush_trajectories():
+    """阻塞直到所有已入队的轨迹保存完成"""
+    _SAVE_QUEUE.join()
+
+
+# 进程退出时清空队列，守护线程不会丢写
+atexit.register(flush_trajectories)
+
+
 def save_mcp_trajectory(
     task: str,
     reasoning_chain: Dict,
     mcp_results: List[Dict],
-    success: bool = True
-) -> str:
+    success: bool = True,
+    execution_summary: Optional[str] = None,
+    mcp_tools_called: Optional[List[str]] = None,
+    mcp_errors: Optional[List[str]] = None
+):
     """
-    保存包含 MCP 执行信息的协作轨迹
-    
+    异步保存包含 MCP 执行信息的协作轨迹
+
+    保存任务入队后立即返回，由后台写线程落盘；
+    需要确保写完时调用 flush_trajectories()。
+
     Args:
         task: 用户任务
         reasoning_chain: 推理链
         mcp_results: MCP 执行结果列表
         success: 是否成功
-        
-    Returns:
-        轨迹文件路径
+        execution_summary: mcp_results 已序列化的 JSON 串（调用方已有则传入，避免重复序列化）
+        mcp_tools_called: 调用方已汇总的工具名列表（传入则不再遍历 mcp_results）
+        mcp_errors: 调用方已汇总的错误列表
     """
-    # 提取 MCP 相关信息
-    mcp_tools_called = [r.get("tool_name", "") for r in mcp_results if r.get("tool_name")]
-    mcp_errors = [r.get("error", "") for r in mcp_results if r.get("error")]
-    
-    return save_collaboration_trajectory(
+    # 提取 MCP 相关信息（调用方未预汇总时才各遍历一次）
+    if mcp_tools_called is None:
+        mcp_tools_called = [r["tool_name"] for r in mcp_results if r.get("tool_name")]
+    if mcp_errors is None:
+        mcp_errors = [r["error"] for r in mcp_results if r.get("error")]
+    # 结果以序列化形式入队：写线程只做 I/O，不再重复 dumps
+    if execution_summary is None:
+        execution_summary = _json_dumps(mcp_results)
+    mcp_call_count = len(mcp_results)
+
+    def _job():
+        _do_save_trajectory(task, reasoning_chain, execution_summary, success,
+                            mcp_tools_called, mcp_errors, mcp_call_count)
+
+    _ensure_writer_thread()
+    _SAVE_QUEUE.put(_job)
+
+
+def _do_save_trajectory(
+    task: str,
+    reasoning_chain: Dict,
+    execution_summary: str,
+    success: bool,
+    mcp_tools_called: List[str],
+    mcp_errors: List[str],
+    mcp_call_count: int
+) -> str:
+    """实际执行轨迹落盘（在写线程中运行）"""
+    return _lazy_save_trajectory(
         task=task,
         reasoning_chain=reasoning_chain,
-        execution_result=json.dumps(mcp_results, ensure_ascii=False),
+        execution_result=execution_summary,
         screenshot_paths=[],
         success=success,
         metadata={
             "source": "mcp_integration",
             "mcp_tools_called": mcp_tools_called,
             "mcp_errors": mcp_errors,
-            "mcp_call_count": len(mcp_results)
+            "mcp_call_count": mcp_call_count
         }
     )
 
@@ -740,16 +1123,20 @@ def save_mcp_trajectory(
 # 便捷接口
 # ============================================================
 
-# 全局 MCP 客户端实例
+# 全局 MCP 客户端实例（双重检查锁保证多线程只建一条连接）
 _mcp_client: Optional[MCPClient] = None
+_client_lock = threading.Lock()
 
 
 def get_mcp_client() -> MCPClient:
-    """获取全局 MCP 客户端实例"""
+    """获取全局 MCP 客户端实例（单例，线程安全）"""
     global _mcp_client
     if _mcp_client is None:
-        _mcp_client = MCPClient()
-        _mcp_client.connect()
+        with _client_lock:
+            if _mcp_client is None:
+                client = MCPClient()
+                client.connect()
+                _mcp_client = client
     return _mcp_client
 
 
@@ -800,12 +1187,13 @@ def mcp_status() -> Dict:
     }
     
     if client.connected:
-        tools = client.tools_list()
-        agents = client.agents_list()
-        status["tools_count"] = tools.get("total", 0)
-        status["agents_count"] = agents.get("total", 0)
-        status["agents"] = [a["name"] for a in agents.get("agents", [])]
-    
+        # 走共享的 TTL 缓存，状态查询不再各自多发两次列表 RPC
+        tool_map = get_available_tools(client)
+        agents = get_available_agents(client)
+        status["tools_count"] = len(tool_map)
+        status["agents_count"] = len(agents)
+        status["agents"] = [a["name"] for a in agents]
+
     return status
 
 
@@ -813,11 +1201,33 @@ def mcp_status() -> Dict:
 # 测试函数
 # ============================================================
 
-def test_mcp_integration():
-    """测试 MCP 集成功能"""
+def test_mcp_integration(verbose: bool = True):
+    """测试 MCP 集成功能
+
+    Args:
+        verbose: 是否打印逐项明细（大结构一律截断，避免整段 repr 大字典）
+    """
     print("\n" + "🔌 MCP 联调测试 🔌".center(60))
     print("=" * 60)
-    
+
+    # 测试 0: 动作解析（纯本地，不依赖 MCP 连接）
+    print("\n--- 测试 0: 动作解析 ---")
+    parse_tool_map = {
+        "search_file": {"parameters": {"dir": {}, "pattern": {}}},
+        "move_to_trash": {"parameters": {"file_path": {}}},
+    }
+    # 中文动作串里工具名直接贴着汉字，必须照常识别
+    cjk_actions = [
+        ("调用search_file工具搜索", "search_file"),
+        ("使用search_file搜索~/Downloads", "search_file"),
+        ("search_file搜索", "search_file"),
+        ("用move_to_trash删除文件file_path=~/a.png", "move_to_trash"),
+    ]
+    for cjk_action, expected_tool in cjk_actions:
+        parsed = parse_tool_call_from_action(cjk_action, parse_tool_map)
+        ok = parsed is not None and parsed["tool_name"] == expected_tool
+        print(f"  {'✓' if ok else '✗'} {cjk_action} -> {parsed and parsed['tool_name']}")
+
     # 创建 MCP 客户端
     client = MCPClient()
     
@@ -844,8 +1254,9 @@ def test_mcp_integration():
     tools = client.tools_list()
     if tools.get("success"):
         print(f"  可用工具数: {tools['total']}")
-        for tool in tools["tools"]:
-            print(f"    - {tool['name']} ({tool['agent']})")
+        if verbose:
+            for tool in tools["tools"]:
+                print(f"    - {tool['name']} ({tool['agent']})")
     else:
         print(f"  ✗ 获取失败: {tools.get('error')}")
     
@@ -854,9 +1265,10 @@ def test_mcp_integration():
     agents = client.agents_list()
     if agents.get("success"):
         print(f"  已注册子智能体数: {agents['total']}")
-        for agent in agents["agents"]:
-            status = "在线" if agent["is_alive"] else "离线"
-            print(f"    - {agent['name']} ({status})")
+        if verbose:
+            for agent in agents["agents"]:
+                status = "在线" if agent["is_alive"] else "离线"
+                print(f"    - {agent['name']} ({status})")
     else:
         print(f"  ✗ 获取失败: {agents.get('error')}")
     
@@ -865,7 +1277,8 @@ def test_mcp_integration():
     result = client.tools_call("search_file", {"dir": "~/Downloads", "pattern": "*.png"})
     if result.get("success"):
         print(f"  ✓ search_file 调用成功")
-        print(f"    结果: {result['result']}")
+        if verbose:
+            print(f"    结果: {repr(result['result'])[:120]}")
     else:
         print(f"  ✗ 调用失败: {result.get('error')}")
     
@@ -876,7 +1289,7 @@ def test_mcp_integration():
     reasoning_chain, execution_results = reasoning_with_mcp(
         user_task=test_task,
         mcp_client=client,
-        verbose=True
+        verbose=verbose
     )
     
     # 打印总结
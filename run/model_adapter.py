@@ -13,11 +13,13 @@
 
 import os
 import json
-import requests
 import time
 from typing import Optional, Dict, List, Tuple
 from enum import Enum
 
+# requests 延迟到实例化时才导入：仅为读取配置/列举模型而
+# import 本模块的短生命周期进程无需付出其导入开销
+
 
 class ModelType(Enum):
     """模型类型"""
@@ -46,6 +48,18 @@ class ModelAdapter:
         self.model_config: Dict[str, Dict] = {}
         self.available_models: List[str] = []
         self.model_health: Dict[str, bool] = {}
+        # 健康检查 TTL 缓存: 模型名 -> (检查时刻, 结果)
+        self._health_cache: Dict[str, Tuple[float, bool]] = {}
+        self._health_ttl = 5.0
+
+        # 首次需要网络时才导入 requests
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._requests = requests
+
+        # 复用 keep-alive 连接池，免去每次请求重建 TCP 连接
+        self.session = requests.Session()
+        self.session.mount(self.api_base, HTTPAdapter(pool_connections=2, pool_maxsize=4))
         
         # 加载模型配置
         self._load_model_config()
@@ -113,6 +127,12 @@ class ModelAdapter:
                             self.model_config[model_name].update(config)
             except:
                 pass
+
+        # type 统一规整为字符串，查询路径不再做 isinstance 判断
+        for config in self.model_config.values():
+            model_type = config.get("type", "")
+            if isinstance(model_type, ModelType):
+                config["type"] = model_type.value
     
     def _detect_available_models(self):
         """检测可用模型（检查模型路径是否存在）"""
@@ -131,40 +151,48 @@ class ModelAdapter:
             key=lambda x: self.model_config.get(x, {}).get("priority", 999)
         )
     
-    def _check_model_health(self, model_name: str) -> bool:
+    def _check_model_health(self, model_name: str, force: bool = False) -> bool:
         """
-        检查模型健康状态（通过API ping）
-        
+        检查模型健康状态（通过API ping，带短 TTL 缓存）
+
+        auto_switch_model / list_available_models 会对每个模型逐一检查，
+        TTL 内直接复用上次结果，避免一次列举触发 2N 个网络往返。
+        只请求 /v1/models 一个端点：能拿到模型列表本身就说明服务在线。
+
         Args:
             model_name: 模型名称
-        
+            force: 是否强制探测（忽略 TTL 缓存）
+
         Returns:
             是否健康
         """
+        cached = None if force else self._health_cache.get(model_name)
+        if cached is not None:
+            ts, ok = cached
+            if time.monotonic() - ts < self._health_ttl:
+                return ok
+
+        result = False
         try:
-            # 尝试调用API健康检查
-            response = requests.get(
-                f"{self.api_base}/health",
+            # /v1/models 一个请求既确认服务在线又返回已加载模型
+            models_response = self.session.get(
+                f"{self.api_base}/v1/models",
                 timeout=2
             )
-            if response.status_code == 200:
-                # 检查模型是否已加载
-                models_response = requests.get(
-                    f"{self.api_base}/v1/models",
-                    timeout=2
-                )
-                if models_response.status_code == 200:
-                    models_data = models_response.json()
-                    loaded_models = [m.get("id", "") for m in models_data.get("data", [])]
-                    model_path = self.model_config.get(model_name, {}).get("path", "")
-                    # 检查模型路径是否匹配
-                    for loaded_model in loaded_models:
-                        if model_path in loaded_model or model_name in loaded_model:
-                            return True
+            if models_response.status_code == 200:
+                models_data = models_response.json()
+                loaded_models = [m.get("id", "") for m in models_data.get("data", [])]
+                model_path = self.model_config.get(model_name, {}).get("path", "")
+                # 检查模型路径是否匹配
+                for loaded_model in loaded_models:
+                    if model_path in loaded_model or model_name in loaded_model:
+                        result = True
+                        break
         except:
             pass
-        
-        return False
+
+        self._health_cache[model_name] = (time.monotonic(), result)
+        return result
     
     def auto_switch_model(self) -> Optional[str]:
         """
@@ -217,6 +245,10 @@ class ModelAdapter:
     def get_current_model(self) -> Optional[str]:
         """获取当前模型"""
         return self.current_model
+
+    def close(self):
+        """关闭 HTTP 连接池"""
+        self.session.close()
     
     def get_model_config(self, model_name: Optional[str] = None) -> Dict:
         """
@@ -268,7 +300,7 @@ class ModelAdapter:
         
         # 调用API
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_base}/v1/completions",
                 json={
                     "model": target_model,
@@ -289,7 +321,7 @@ class ModelAdapter:
                 print(f"✗ API调用失败: {response.status_code}")
                 return None
                 
-        except requests.exceptions.RequestException as e:
+        except self._requests.exceptions.RequestException as e:
             print(f"✗ API请求失败: {e}")
             # 尝试切换到其他模型
             if not model_name:  # 只有自动选择时才切换
@@ -300,10 +332,92 @@ class ModelAdapter:
                             return self.generate(prompt, max_tokens, temperature, alt_model)
             return None
     
-    def list_available_models(self) -> List[Dict]:
+    def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        model_name: Optional[str] = None
+    ):
+        """
+        流式生成文本（SSE 逐 token 产出）
+
+        与 generate 不同，不等整段生成完再返回：调用方在首 token
+        产出后即可开始消费，把推理时间和传输/下游处理重叠起来；
+        中途 break 即可提前终止生成。
+
+        Args:
+            prompt: 输入提示
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            model_name: 指定模型名称（可选）
+
+        Yields:
+            文本增量片段
+        """
+        # 选择模型
+        target_model = model_name or self.current_model
+        if not target_model:
+            target_model = self.auto_switch_model()
+            if not target_model:
+                print("✗ 无可用模型")
+                return
+
+        # 获取模型配置
+        config = self.get_model_config(target_model)
+        max_tokens = max_tokens or config.get("max_tokens", 2048)
+        temperature = temperature if temperature is not None else config.get("temperature", 0.7)
+
+        try:
+            response = self.session.post(
+                f"{self.api_base}/v1/completions",
+                json={
+                    "model": target_model,
+                    "prompt": prompt,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "stop": ["\n\n"],
+                    "stream": True
+                },
+                timeout=30,
+                stream=True
+            )
+
+            if response.status_code != 200:
+                print(f"✗ API调用失败: {response.status_code}")
+                return
+
+            # 解析 SSE 帧: data: {...} / data: [DONE]
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                line = line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except json.JSONDecodeError:
+                    continue
+                choices = chunk.get("choices", [])
+                if choices:
+                    text = choices[0].get("text", "")
+                    if text:
+                        yield text
+
+        except self._requests.exceptions.RequestException as e:
+            print(f"✗ API请求失败: {e}")
+
+    def list_available_models(self, fresh: bool = False) -> List[Dict]:
         """
         列出所有可用模型
-        
+
+        Args:
+            fresh: 是否强制重新探测各模型健康状态
+                （默认复用 TTL 缓存，避免每次列举都逐模型发请求）
+
         Returns:
             模型信息列表
         """
@@ -313,12 +427,12 @@ class ModelAdapter:
             models.append({
                 "name": model_name,
                 "path": config.get("path", ""),
-                "type": config.get("type", "").value if isinstance(config.get("type"), ModelType) else "",
+                "type": config.get("type", ""),
                 "priority": config.get("priority", 999),
                 "is_current": model_name == self.current_model,
-                "is_healthy": self._check_model_health(model_name) if model_name in self.available_models else False
+                "is_healthy": self._check_model_health(model_name, force=fresh)
             })
-        
+
         return models
 
 
@@ -17,8 +17,11 @@ System-2 可解释推理模板 - openKylin GUI Agent
 
 import requests
 import base64
+import copy
+import functools
 import json
 import re
+import sys
 from pathlib import Path
 from typing import Optional, Dict, Any, Union
 from datetime import datetime
@@ -31,6 +34,13 @@ except ImportError:
     HAS_JSON5 = False
     print("警告: json5未安装，将使用标准json解析。建议安装: pip install json5")
 
+# 尝试导入 orjson 加速推理示例落盘（缺失则退回标准库）
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # ============================================================
 # API 配置
 # ============================================================
@@ -38,6 +48,19 @@ except ImportError:
 API_BASE = os.getenv("VLLM_API_BASE", "http://localhost:8000")
 MODEL_NAME = os.getenv("VLLM_MODEL_NAME", "/data1/models/UI-TARS-1.5-7B")
 
+# 进程级 HTTP 会话：keep-alive 复用到 vLLM 的 TCP 连接，
+# 重试与流水线多次调用不再每次重建连接握手
+_SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+# 显式声明 keep-alive 与压缩：大响应走 gzip 传输（requests 自动解压），
+# 连接跨请求复用不重建
+_SESSION.headers.update({
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+})
+
 # 导入模型适配器
 try:
     from model_adapter import get_model_adapter
@@ -46,6 +69,17 @@ except ImportError:
     HAS_MODEL_ADAPTER = False
     print("警告: 模型适配器未找到，将使用默认模型")
 
+# 导入 LLM 响应缓存（低温度调用的结果落盘复用，重复请求不再打到 GPU）
+try:
+    from utils.llm_cache import get_llm_cache, make_cache_key, CACHE_TEMPERATURE_MAX
+    HAS_LLM_CACHE = True
+except ImportError:
+    try:
+        from llm_cache import get_llm_cache, make_cache_key, CACHE_TEMPERATURE_MAX
+        HAS_LLM_CACHE = True
+    except ImportError:
+        HAS_LLM_CACHE = False
+
 # ============================================================
 # System-2 核心 Prompt 模板
 # ============================================================
@@ -218,39 +252,43 @@ SYSTEM2_COMBINED_PROMPT = """你是openKylin桌面的GUI智能体，需要完成
 # 辅助函数
 # ============================================================
 
+# JSON提取/修复正则（模块加载时编译一次，解析每条模型响应不再重复编译）
+_JSON_FENCED = re.compile(r'```json\s*([\s\S]*?)\s*```')    # ```json ... ```
+_JSON_ANY_FENCE = re.compile(r'```\s*([\s\S]*?)\s*```')     # ``` ... ```
+_JSON_BRACE = re.compile(r'\{[\s\S]*\}')                    # 直接的JSON对象
+_FENCE_HEAD = re.compile(r'^```\w*\n?')
+_FENCE_TAIL = re.compile(r'\n?```$')
+_TRAIL_COMMA_OBJ = re.compile(r',\s*}')
+_TRAIL_COMMA_ARR = re.compile(r',\s*]')
+
+
 def parse_json_response(response_text: str) -> Optional[Dict]:
     """
     从模型响应中解析JSON
-    
+
     Args:
         response_text: 模型原始输出
-        
+
     Returns:
         解析后的字典，失败返回None
     """
     # 尝试提取JSON块
-    json_patterns = [
-        r'```json\s*([\s\S]*?)\s*```',  # ```json ... ```
-        r'```\s*([\s\S]*?)\s*```',       # ``` ... ```
-        r'\{[\s\S]*\}',                   # 直接的JSON对象
-    ]
-    
     json_str = None
-    for pattern in json_patterns:
-        match = re.search(pattern, response_text)
+    for pattern, group in ((_JSON_FENCED, 1), (_JSON_ANY_FENCE, 1), (_JSON_BRACE, 0)):
+        match = pattern.search(response_text)
         if match:
-            json_str = match.group(1) if '```' in pattern else match.group(0)
+            json_str = match.group(group)
             break
-    
+
     if not json_str:
         json_str = response_text.strip()
-    
+
     # 清理JSON字符串
     json_str = json_str.strip()
     if json_str.startswith('```'):
-        json_str = re.sub(r'^```\w*\n?', '', json_str)
-        json_str = re.sub(r'\n?```$', '', json_str)
-    
+        json_str = _FENCE_HEAD.sub('', json_str)
+        json_str = _FENCE_TAIL.sub('', json_str)
+
     # 尝试解析
     try:
         if HAS_JSON5:
@@ -261,8 +299,8 @@ def parse_json_response(response_text: str) -> Optional[Dict]:
         # 尝试修复常见问题
         try:
             # 移除末尾多余的逗号
-            json_str = re.sub(r',\s*}', '}', json_str)
-            json_str = re.sub(r',\s*]', ']', json_str)
+            json_str = _TRAIL_COMMA_OBJ.sub('}', json_str)
+            json_str = _TRAIL_COMMA_ARR.sub(']', json_str)
             if HAS_JSON5:
                 return json5.loads(json_str)
             else:
@@ -271,76 +309,77 @@ def parse_json_response(response_text: str) -> Optional[Dict]:
             return None
 
 
+def _normalize_execution_plan(chain: Dict) -> bool:
+    """为 execution_plan 各项补齐扩展字段默认值，项类型非法返回 False"""
+    for plan_item in chain.get("execution_plan", []):
+        if not isinstance(plan_item, dict):
+            return False
+        if "context_ref" not in plan_item:
+            plan_item["context_ref"] = None  # 默认值
+        if "tool_extend" not in plan_item:
+            plan_item["tool_extend"] = False  # 默认值
+        if "tool" not in plan_item:
+            plan_item["tool"] = ""  # 默认值
+    return True
+
+
 def validate_reasoning_chain(chain: Dict) -> tuple:
     """
     验证推理链格式是否正确（支持扩展字段）
-    
+
     Args:
         chain: 解析后的推理链字典
-        
+
     Returns:
         (is_valid, error_message)
     """
-    required_fields = ["thought_chain"]
-    thought_chain_fields = ["task_decomposition"]
-    
-    # 检查顶层字段
-    for field in required_fields:
-        if field not in chain:
-            return False, f"缺失顶层字段: {field}"
-    
-    # 检查thought_chain字段
-    if "thought_chain" in chain:
-        for field in thought_chain_fields:
-            if field not in chain["thought_chain"]:
-                return False, f"thought_chain缺失字段: {field}"
-    
-    # 检查execution_plan字段（如果存在）
-    if "execution_plan" in chain:
-        for plan_item in chain["execution_plan"]:
-            if not isinstance(plan_item, dict):
-                return False, "execution_plan项必须是字典"
-            # 验证扩展字段（可选）
-            if "context_ref" not in plan_item:
-                plan_item["context_ref"] = None  # 默认值
-            if "tool_extend" not in plan_item:
-                plan_item["tool_extend"] = False  # 默认值
-            if "tool" not in plan_item:
-                plan_item["tool"] = ""  # 默认值
-    
+    if "task_decomposition" not in chain.get("thought_chain", {}):
+        return False, "thought_chain缺失字段: task_decomposition"
+    if not _normalize_execution_plan(chain):
+        return False, "execution_plan项必须是字典"
     return True, "格式正确"
 
 
+# 兜底推理链静态骨架：只有三个字段依赖 user_task，
+# 其余结构在模块加载时建好，失败路径上 deepcopy + 填空即可
+_FALLBACK_TEMPLATE = {
+    "thought_chain": {
+        "task_understanding": None,
+        "task_decomposition": None,
+        "agent_selection": [
+            {"step": 1, "agent": "DefaultAgent", "reason": "默认处理"},
+            {"step": 2, "agent": "DefaultAgent", "reason": "执行核心操作"},
+            {"step": 3, "agent": "DefaultAgent", "reason": "验证结果"}
+        ],
+        "risk_assessment": "可能存在操作失败风险",
+        "fallback_plan": "重试1次后提示用户手动操作"
+    },
+    "execution_plan": [
+        {"step": 1, "action": "分析任务", "agent": "DefaultAgent"},
+        {"step": 2, "action": None, "agent": "DefaultAgent"},
+        {"step": 3, "action": "验证结果", "agent": "DefaultAgent"}
+    ],
+    "milestone_markers": ["analyze", "execute", "verify"],
+    "_is_fallback": True
+}
+
+
 def create_fallback_chain(user_task: str) -> Dict:
     """
     创建兜底推理链（当模型输出格式错误时使用）
-    
+
     Args:
         user_task: 用户任务描述
-        
+
     Returns:
         兜底推理链字典
     """
-    return {
-        "thought_chain": {
-            "task_understanding": f"执行用户任务: {user_task}",
-            "task_decomposition": f"1. 分析任务需求；2. 执行{user_task}核心操作；3. 验证执行结果",
-            "agent_selection": [
-                {"step": 1, "agent": "DefaultAgent", "reason": "默认处理"},
-                {"step": 2, "agent": "DefaultAgent", "reason": "执行核心操作"},
-                {"step": 3, "agent": "DefaultAgent", "reason": "验证结果"}
-            ],
-            "risk_assessment": "可能存在操作失败风险",
-            "fallback_plan": "重试1次后提示用户手动操作"
-        },
-        "execution_plan": [
-            {"step": 1, "action": "分析任务", "agent": "DefaultAgent"},
-            {"step": 2, "action": user_task, "agent": "DefaultAgent"},
-            {"step": 3, "action": "验证结果", "agent": "DefaultAgent"}
-        ],
-        "milestone_markers": ["analyze", "execute", "verify"],
-        "_is_fallback": True
-    }
+    chain = copy.deepcopy(_FALLBACK_TEMPLATE)
+    thought_chain = chain["thought_chain"]
+    thought_chain["task_understanding"] = f"执行用户任务: {user_task}"
+    thought_chain["task_decomposition"] = f"1. 分析任务需求；2. 执行{user_task}核心操作；3. 验证执行结果"
+    chain["execution_plan"][1]["action"] = user_task
+    return chain
 
 
 # ============================================================
@@ -388,12 +427,23 @@ def call_vllm_api(
         "max_tokens": max_tokens,
         "temperature": temperature,
     }
-    
+
+    # 低温度调用近似确定性：命中本地响应缓存则直接返回
+    cache_key = None
+    if HAS_LLM_CACHE and temperature <= CACHE_TEMPERATURE_MAX:
+        cache_key = make_cache_key(model_path, messages, temperature)
+        cached = get_llm_cache().get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
-        response = requests.post(url, json=payload, timeout=timeout)
+        response = _SESSION.post(url, json=payload, timeout=timeout)
         response.raise_for_status()
         result = response.json()
-        return result['choices'][0]['message']['content']
+        content = result['choices'][0]['message']['content']
+        if cache_key is not None and content is not None:
+            get_llm_cache().set(cache_key, content)
+        return content
     except Exception as e:
         print(f"API调用失败: {e}")
         
@@ -413,19 +463,61 @@ def call_vllm_api(
         return None
 
 
-def encode_image(image_path: str) -> Optional[str]:
+# 截图扩展名 -> MIME 类型（模块级常量，热路径不再每次重建字典）
+_MIME_MAP = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+_DEFAULT_MIME = "image/png"
+
+
+@functools.lru_cache(maxsize=16)
+def _encode_image_cached(image_path: str, mtime_ns: int, size: int) -> str:
+    """读取并编码图片（按 路径+mtime+大小 缓存，文件变更自动失效）"""
+    with open(image_path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+@functools.lru_cache(maxsize=16)
+def _data_url_cached(image_path: str, mtime_ns: int, size: int, mime_type: str) -> str:
+    """缓存完整 data: URL：兆级大字符串的拼接每个文件版本只做一次"""
+    return f"data:{mime_type};base64,{_encode_image_cached(image_path, mtime_ns, size)}"
+
+
+def encode_image_data_url(image_path: Union[str, Path]) -> Optional[str]:
     """
-    将图片编码为base64
-    
+    将图片编码为 data:mime;base64,... 形式的完整 URL（整串缓存）
+
     Args:
         image_path: 图片路径
-        
+
+    Returns:
+        data: URL 字符串，失败返回None
+    """
+    try:
+        path = Path(image_path)
+        st = path.stat()
+        mime_type = _MIME_MAP.get(path.suffix.lower(), _DEFAULT_MIME)
+        return _data_url_cached(str(path), st.st_mtime_ns, st.st_size, mime_type)
+    except Exception as e:
+        print(f"图片编码失败: {e}")
+        return None
+
+
+def encode_image(image_path: Union[str, Path]) -> Optional[str]:
+    """
+    将图片编码为base64
+
+    同一截图的重复调用（重试、多轮推理）直接命中缓存，
+    不再重复读文件和编码。
+
+    Args:
+        image_path: 图片路径（str 或 Path，调用方已有 Path 对象时无需转回字符串）
+
     Returns:
         base64编码字符串
     """
     try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        path = Path(image_path)
+        st = path.stat()
+        return _encode_image_cached(str(path), st.st_mtime_ns, st.st_size)
     except Exception as e:
         print(f"图片编码失败: {e}")
         return None
@@ -468,6 +560,8 @@ def generate_master_reasoning(
     except:
         enhanced_prompt = SYSTEM2_MASTER_PROMPT
     
+    # 不变的系统提示词放最前且不插入时间戳/任务ID：
+    # vLLM 开启 --enable-prefix-caching 后同一前缀的 KV 缓存跨请求复用
     messages = [
         {"role": "system", "content": enhanced_prompt},
         {"role": "user", "content": f"用户任务：{user_task}\n\n请严格按照JSON格式输出推理链："}
@@ -490,25 +584,31 @@ def generate_master_reasoning(
         
         if verbose:
             print(f"模型原始输出:\n{raw_output[:500]}...")
-        
+
+        # 廉价预过滤：原始输出连 task_decomposition 子串都没有时
+        # 必然通不过校验，直接重试，省掉整个 JSON 解析
+        if "task_decomposition" not in raw_output:
+            print(f"格式验证失败: 缺少task_decomposition，重试中...")
+            continue
+
         # 解析JSON
         reasoning_chain = parse_json_response(raw_output)
-        
+
         if reasoning_chain is None:
             print(f"JSON解析失败，重试中...")
             continue
-        
-        # 验证格式
-        is_valid, error_msg = validate_reasoning_chain(reasoning_chain)
-        
-        if is_valid:
+
+        # 验证格式（单行键检查 + 扩展字段默认值补齐）
+        if (isinstance(reasoning_chain, dict)
+                and "task_decomposition" in reasoning_chain.get("thought_chain", {})
+                and _normalize_execution_plan(reasoning_chain)):
             if verbose:
                 print(f"\n✓ 推理链生成成功!")
             reasoning_chain["_raw_output"] = raw_output
             reasoning_chain["_retry_count"] = retry + 1
             return reasoning_chain
         else:
-            print(f"格式验证失败: {error_msg}，重试中...")
+            print(f"格式验证失败，重试中...")
     
     # 所有重试失败，返回兜底推理链
     print(f"\n⚠️ 所有重试失败，使用兜底推理链")
@@ -553,20 +653,18 @@ def generate_gui_action(
             history_text += f"{i}. {action}\n"
         prompt += history_text
     
-    # 构建消息
-    if screenshot_path and Path(screenshot_path).exists():
-        image_data = encode_image(screenshot_path)
-        if image_data:
-            ext = Path(screenshot_path).suffix.lower()
-            mime_type = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}.get(ext, "image/png")
-            
+    # 构建消息（Path 只构造一次，存在性检查只 stat 一次，data URL 走缓存）
+    screenshot = Path(screenshot_path) if screenshot_path else None
+    if screenshot is not None and screenshot.is_file():
+        image_url = encode_image_data_url(screenshot)
+        if image_url:
             messages = [
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "image_url",
-                            "image_url": {"url": f"data:{mime_type};base64,{image_data}"}
+                            "image_url": {"url": image_url}
                         },
                         {"type": "text", "text": prompt}
                     ]
@@ -595,21 +693,24 @@ def generate_gui_action(
         
         # 解析JSON
         action_result = parse_json_response(raw_output)
-        
-        if action_result and "action" in action_result:
-            if verbose:
-                print(f"\n✓ GUI操作生成成功!")
-            action_result["_raw_output"] = raw_output
-            return action_result
-        
-        # 尝试解析Thought/Action格式
-        thought_match = re.search(r'Thought:\s*(.+?)(?=Action:|$)', raw_output, re.DOTALL)
-        action_match = re.search(r'Action:\s*(.+?)(?=Thought:|$)', raw_output, re.DOTALL)
-        
-        if action_match:
-            action_text = action_match.group(1).strip()
-            thought_text = thought_match.group(1).strip() if thought_match else ""
-            
+
+        if action_result is not None:
+            if "action" in action_result:
+                if verbose:
+                    print(f"\n✓ GUI操作生成成功!")
+                action_result["_raw_output"] = raw_output
+                return action_result
+            # 能解析成 JSON 但缺 action 字段：不会是 Thought/Action 文本，
+            # 不必再做两次全文正则扫描，直接重试
+            continue
+
+        # JSON 彻底解析失败才走 Thought/Action 文本回退（单个合并正则扫一遍）
+        ta_match = _THOUGHT_ACTION_RE.search(raw_output)
+
+        if ta_match:
+            action_text = ta_match.group('a').strip()
+            thought_text = (ta_match.group('t') or "").strip()
+
             # 解析action
             action_result = {
                 "thought_chain": {
@@ -619,7 +720,7 @@ def generate_gui_action(
                 "action": parse_action_text(action_text),
                 "_raw_output": raw_output
             }
-            
+
             if action_result["action"]:
                 if verbose:
                     print(f"\n✓ GUI操作生成成功 (Thought/Action格式)!")
@@ -636,36 +737,42 @@ def generate_gui_action(
     }
 
 
+# Action 文本解析正则（模块级预编译）
+# Thought/Action 两段合并成一个模式，单遍扫描同时取出两部分（Thought 可缺省）
+_THOUGHT_ACTION_RE = re.compile(
+    r'(?:Thought:\s*(?P<t>.+?)\s*)?Action:\s*(?P<a>.+?)(?=Thought:|$)', re.DOTALL
+)
+_ACTION_CALL_RE = re.compile(r'(\w+)\((.*)\)')
+# 三种取值写法合并为一个选择分支：key='value' / key="value" / key=(x,y)
+_ACTION_PARAM_RE = re.compile(r"(\w+)=(?:'([^']*)'|\"([^\"]*)\"|(\([^)]+\)))")
+
+
 def parse_action_text(action_text: str) -> Optional[Dict]:
     """
     解析Action文本为结构化字典
-    
+
     Args:
         action_text: 如 "click(start_box='(100,200)')"
-        
+
     Returns:
         {"type": "click", "params": {"start_box": "(100,200)"}}
     """
     # 匹配函数调用格式
-    match = re.match(r'(\w+)\((.*)\)', action_text.strip())
+    match = _ACTION_CALL_RE.match(action_text.strip())
     if not match:
         return None
-    
+
     action_type = match.group(1)
     params_str = match.group(2)
-    
-    # 解析参数
+
+    # 解析参数：单遍扫描，三个候选组中非空者即为取值
     params = {}
-    param_patterns = [
-        r"(\w+)='([^']*)'",  # key='value'
-        r'(\w+)="([^"]*)"',  # key="value"
-        r"(\w+)=(\([^)]+\))",  # key=(x,y)
-    ]
-    
-    for pattern in param_patterns:
-        for m in re.finditer(pattern, params_str):
-            params[m.group(1)] = m.group(2)
-    
+    for m in _ACTION_PARAM_RE.finditer(params_str):
+        value = m.group(2)
+        if value is None:
+            value = m.group(3) if m.group(3) is not None else m.group(4)
+        params[m.group(1)] = value
+
     return {"type": action_type, "params": params}
 
 
@@ -768,21 +875,30 @@ def save_reasoning_examples(results: list, output_path: str = None):
             "success": r["success"]
         }
         
+        # 字典推导直接跳过 _raw_output，省掉 copy + pop 的二次分配
         if r["master_reasoning"]:
-            mr = r["master_reasoning"].copy()
-            mr.pop("_raw_output", None)
-            clean_r["master_reasoning"] = mr
-        
+            clean_r["master_reasoning"] = {
+                k: v for k, v in r["master_reasoning"].items() if k != "_raw_output"
+            }
+
         if r["gui_action"]:
-            ga = r["gui_action"].copy()
-            ga.pop("_raw_output", None)
-            clean_r["gui_action"] = ga
+            clean_r["gui_action"] = {
+                k: v for k, v in r["gui_action"].items() if k != "_raw_output"
+            }
         
         clean_results.append(clean_r)
     
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(clean_results, f, indent=2, ensure_ascii=False)
-    
+    # 先在内存中编码完再一次性写出：
+    # json.dump 会按 iterencode 片段做大量小 write() 调用
+    if HAS_ORJSON:
+        # orjson 直接产出 UTF-8 字节，无需 ensure_ascii
+        Path(output_path).write_bytes(
+            orjson.dumps(clean_results, option=orjson.OPT_INDENT_2)
+        )
+    else:
+        data = json.dumps(clean_results, indent=2, ensure_ascii=False)
+        Path(output_path).write_text(data, encoding="utf-8")
+
     print(f"\n推理链示例已保存到: {output_path}")
 
 
@@ -797,7 +913,7 @@ def test_api_health():
     print("="*60)
     
     try:
-        response = requests.get(f"{API_BASE}/health", timeout=10)
+        response = _SESSION.get(f"{API_BASE}/health", timeout=10)
         if response.status_code == 200:
             print("✓ API服务正常")
             return True
@@ -821,9 +937,19 @@ def main():
         print("  python -m vllm.entrypoints.openai.api_server \\")
         print("    --model /data1/models/UI-TARS-1.5-7B \\")
         print("    --trust-remote-code --dtype bfloat16 \\")
-        print("    --max-model-len 8192 --port 8000")
+        print("    --max-model-len 8192 --port 8000 \\")
+        print("    --enable-prefix-caching")
+        print("  # 多模态部署建议按真实截图尺寸调整 --mm-processor-kwargs，")
+        print("  # 并在预热后调用 reset_mm_cache 释放占位图像显存")
         return
-    
+
+    # 预热后清理 vLLM 多模态占位图像缓存，释放这部分常驻显存；
+    # 端点不存在（旧版本/非多模态部署）时静默忽略
+    try:
+        _SESSION.post(f"{API_BASE}/reset_mm_cache", timeout=5)
+    except Exception:
+        pass
+
     # 测试任务列表
     test_tasks = [
         "搜索~/Downloads目录的png文件并设置为壁纸",
@@ -836,52 +962,62 @@ def main():
     # 测试截图路径（如果存在）
     test_screenshot = "/data1/cyx/anything/麒麟OS桌面.png"
     
-    # 收集测试结果
-    all_results = []
-    success_count = 0
-    
     print("\n" + "="*60)
-    print(f"开始测试 {len(test_tasks)} 个任务")
+    print(f"开始测试 {len(test_tasks)} 个任务（并发执行）")
     print("="*60)
-    
-    for i, task in enumerate(test_tasks, 1):
-        print(f"\n\n{'#'*70}")
-        print(f"# 测试任务 {i}/{len(test_tasks)}: {task}")
-        print(f"{'#'*70}")
-        
-        # 只对第一个任务使用截图
-        screenshot = test_screenshot if i == 1 and Path(test_screenshot).exists() else None
-        
-        result = execute_reasoning_pipeline(
+
+    # 各任务互相独立，并发下发让 vLLM 的连续批处理同时消化多条请求，
+    # 总耗时从各任务延迟之和降到最慢一条的延迟
+    from concurrent.futures import ThreadPoolExecutor
+
+    # 只对第一个任务使用截图
+    tasks = [
+        (i, task, test_screenshot if i == 1 and Path(test_screenshot).exists() else None)
+        for i, task in enumerate(test_tasks, 1)
+    ]
+
+    def _run_task(entry):
+        _, task, screenshot = entry
+        return execute_reasoning_pipeline(
             user_task=task,
             screenshot_path=screenshot,
-            verbose=True
+            verbose=False
         )
-        
-        all_results.append(result)
-        
-        if result["success"]:
-            success_count += 1
-        
-        # 打印推理链摘要
+
+    # executor.map 保持结果与任务顺序一致
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        all_results = list(executor.map(_run_task, tasks))
+
+    success_count = sum(1 for r in all_results if r["success"])
+
+    # 摘要在全部任务完成后按原顺序输出；
+    # 每个任务的横幅+摘要拼成整块一次写出，减少 stdio 锁竞争并保持输出原子
+    for (i, task, _), result in zip(tasks, all_results):
+        lines = ["", "", "#" * 70, f"# 测试任务 {i}/{len(test_tasks)}: {task}", "#" * 70]
+
+        # 推理链摘要
         if result["master_reasoning"]:
-            print("\n--- 推理链摘要 ---")
             tc = result["master_reasoning"].get("thought_chain", {})
-            print(f"任务分解: {tc.get('task_decomposition', 'N/A')[:100]}...")
-            print(f"风险评估: {tc.get('risk_assessment', 'N/A')}")
-    
-    # 打印测试总结
-    print("\n\n" + "="*70)
-    print("测试结果总结")
-    print("="*70)
-    print(f"总任务数: {len(test_tasks)}")
-    print(f"成功数量: {success_count}")
-    print(f"成功率: {success_count/len(test_tasks)*100:.1f}%")
-    
+            lines += [
+                "",
+                "--- 推理链摘要 ---",
+                f"任务分解: {tc.get('task_decomposition', 'N/A')[:100]}...",
+                f"风险评估: {tc.get('risk_assessment', 'N/A')}",
+            ]
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    # 测试总结同样拼成单次写出
+    summary_lines = [
+        "", "", "=" * 70, "测试结果总结", "=" * 70,
+        f"总任务数: {len(test_tasks)}",
+        f"成功数量: {success_count}",
+        f"成功率: {success_count/len(test_tasks)*100:.1f}%",
+    ]
     for i, result in enumerate(all_results, 1):
         status = "✓" if result["success"] else "✗"
         fallback = " (fallback)" if result["master_reasoning"].get("_is_fallback") else ""
-        print(f"  {i}. {result['user_task'][:40]}... {status}{fallback}")
+        summary_lines.append(f"  {i}. {result['user_task'][:40]}... {status}{fallback}")
+    sys.stdout.write("\n".join(summary_lines) + "\n")
     
     # 保存成功的推理链示例
     successful_results = [r for r in all_results if r["success"]]
@@ -1,26 +1,51 @@
 import json
 import os
-from typing import List
+from functools import lru_cache
+from typing import Dict, List
+
+# 尝试导入 orjson 加速配置解析（缺失则退回标准库）
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 配置路径统一在模块级解析一次：utils/ 的上一级即项目根目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> List:
+    """读取并解析 config.json（进程生命周期内只做一次）"""
+    with open(CONFIG_PATH, "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if HAS_ORJSON else json.loads(raw)
+
+
+@lru_cache(maxsize=1)
+def _by_item() -> Dict:
+    """item -> content 索引，每次查询不再线性扫描配置列表"""
+    return {i.get("item"): i.get("content", []) for i in _load_config()}
+
+
+@lru_cache(maxsize=1)
+def _child_index() -> Dict:
+    """子智能体 name -> 配置 索引"""
+    return {agent.get("name"): agent for agent in _by_item().get("ChildAgent", [])}
+
 
 def get_master_config():
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    MASTERAGENT = next((i.get("content", []) for i in config if i.get("item") == "MasterAgent"), None)
+    MASTERAGENT = _by_item().get("MasterAgent")
     assert (MASTERAGENT is not None), "can't find MasterAgent, please check config.json"
     return MASTERAGENT
 
 def get_childen_config() -> List:
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    CHILDENAGENTS = next((i.get("content", []) for i in config if i.get("item") == "ChildAgent"), None)
+    CHILDENAGENTS = _by_item().get("ChildAgent")
     assert (CHILDENAGENTS is not None), "can't find ChildenAgents, please check config.json"
     return CHILDENAGENTS
 
 def get_child_config(agent_name):
-    CHILDENAGENTS = get_childen_config()
-    TARGETAGENT = next((agent for agent in CHILDENAGENTS if agent.get("name") == agent_name), None)
-    assert (TARGETAGENT is not None), f"can't find {agent_name} in ChildenAgents, please check config.json"
\ No newline at end of file
+    TARGETAGENT = _child_index().get(agent_name)
+    assert (TARGETAGENT is not None), f"can't find {agent_name} in ChildenAgents, please check config.json"
+    return TARGETAGENT
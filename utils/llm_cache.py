@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+LLM 响应磁盘缓存
+
+低温度（近似确定性）的推理调用，相同请求的响应按摘要键缓存到本地磁盘；
+开发迭代或测试电池重复运行时直接命中缓存，省掉整次 GPU 推理。
+
+作者：GUI Agent Team
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+# 缓存目录（与其他本地状态同在 kylin-gui-agent 配置目录下）
+CACHE_DIR = os.path.expanduser("~/.config/kylin-gui-agent/llm_cache")
+
+# 温度高于该值视为随机采样，响应不可复用，不做缓存
+CACHE_TEMPERATURE_MAX = 0.3
+
+# 默认过期时间（秒）
+DEFAULT_EXPIRE_SECONDS = 3600
+
+
+def make_cache_key(model: str, messages: list, temperature: float) -> str:
+    """
+    计算请求摘要键：模型 + 消息 + 温度 的 sha256
+
+    Args:
+        model: 模型名称/路径
+        messages: 消息列表
+        temperature: 采样温度
+
+    Returns:
+        sha256 十六进制串
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """基于文件的 LLM 响应缓存（每个键一个 JSON 文件，带过期时间）"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应，未命中或已过期返回 None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("expire_at", 0) < time.time():
+            # 过期条目顺手清理
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        return entry.get("response")
+
+    def set(self, key: str, response: str, expire: int = DEFAULT_EXPIRE_SECONDS):
+        """写入响应（临时文件 + 原子替换，避免读到半截条目）"""
+        path = self._entry_path(key)
+        entry = {"expire_at": time.time() + expire, "response": response}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+# ============================================================
+# 全局实例
+# ============================================================
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """获取 LLM 缓存实例（单例）"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
+# ============================================================
+# 测试
+# ============================================================
+
+if __name__ == "__main__":
+    print("=== 测试LLM响应缓存 ===\n")
+
+    cache = get_llm_cache()
+    key = make_cache_key("test-model", [{"role": "user", "content": "你好"}], 0.05)
+
+    cache.set(key, "测试响应", expire=60)
+    print(f"写入后读取: {cache.get(key)}")
+
+    cache.set(key, "已过期", expire=-1)
+    print(f"过期后读取: {cache.get(key)}")
+
+    print("\n=== 测试完成 ===")
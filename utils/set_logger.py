@@ -1,6 +1,8 @@
+import atexit
 import os
 import time
 import logging
+import logging.handlers
 from pathlib import Path
 
 def set_logger(log_name:str):
@@ -21,12 +23,23 @@ def set_logger(log_name:str):
     logger.setLevel(logging.INFO)
 
     if not logger.handlers:
-        file_handler = logging.FileHandler(LOG_PATH)
+        # delay=True：日志文件推迟到首条落盘记录时才打开
+        file_handler = logging.FileHandler(LOG_PATH, delay=True)
         file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-        logger.addHandler(file_handler)
+
+        # 内存缓冲：攒满 256 条或出现 ERROR 及以上才真正写文件，
+        # 稳态 INFO 刷屏不再每条记录一次 write 系统调用
+        buffered_handler = logging.handlers.MemoryHandler(
+            capacity=256, flushLevel=logging.ERROR, target=file_handler)
+        logger.addHandler(buffered_handler)
+        # 进程退出时清空缓冲，残余记录不丢
+        atexit.register(buffered_handler.flush)
 
         stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
         logger.addHandler(stream_handler)
 
+        # 不向根日志器传播，避免 basicConfig 过的进程里重复输出
+        logger.propagate = False
+
     return logger
\ No newline at end of file